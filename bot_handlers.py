@@ -2,14 +2,18 @@ import os
 import re
 import time
 import asyncio
-from typing import Dict, Any, Optional
-import requests
+import traceback
+from typing import Dict, Any, List, Optional, Tuple
+import aiohttp
+import orjson
 from loguru import logger
 
 from utils.message_storage import (
     Config,
     get_chat_history,
     store_message,
+    flush_messages,
+    clear_history_cache,
     add_chat_id_if_reply,
     clear_chat_history
 )
@@ -17,18 +21,110 @@ from services.bot.messages import (
     WELCOME_MESSAGE,
     HELP_MESSAGE,
     INVALID_REWARD_FORMAT,
-    REWARD_SUCCESS,
-    SUCCESS_MESSAGES
+    SUCCESS_MESSAGES,
+    SUCCESS_FORMATTERS
 )
 
-from services.client import AgentMarketClient
+from services.client import AgentMarketClient, AgentMarketAPIError, get_client
+from services.client_session import get_session, close_session
 from services.request_tracker import RequestTracker
+from services.dynamodb import run_blocking
 from services.bot.provider import send_message_to_provider, parse_provider_mention
-from utils.telegram_utils import send_message, escape_markdown
+from utils.telegram_utils import escape_markdown
+from services.bot.message_queue import message_queue
 from utils.message_storage import get_from_reaction_to_message
 
-BOT_MENTION_PATTERN = r'@group_code_bot\s+(.*)'
-GITHUB_ISSUE_PATTERN = r'(?:https?://)?github\.com/([^/]+)/([^/]+)/issues/(\d+)'
+BOT_MENTION_RE = re.compile(r'@group_code_bot\s+(.*)')
+BOT_NAME_RE = re.compile(r'@group_code_bot', re.IGNORECASE)
+GITHUB_ISSUE_RE = re.compile(r'(?:https?://)?github\.com/([^/]+)/([^/]+)/issues/(\d+)', re.ASCII)
+GITHUB_LINK_RE = re.compile(r'(?:https?://)?github\.com/\S+')
+PROVIDER_REPLY_RE = re.compile(
+    r'message from.*?\(([^)]+)\).*?for instance:\s*'
+    r'\b([0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12})\b',
+    re.IGNORECASE | re.DOTALL
+)
+
+# Welcome and help texts with markdown formatting symbols removed, stripped in one pass
+_MARKDOWN_SYMBOLS = str.maketrans('', '', '*`')
+PLAIN_WELCOME_MESSAGE = WELCOME_MESSAGE.translate(_MARKDOWN_SYMBOLS)
+PLAIN_HELP_MESSAGE = HELP_MESSAGE.translate(_MARKDOWN_SYMBOLS)
+
+# Commands registered with Telegram, shared by the global and per-chat setMyCommands calls
+BOT_COMMANDS = [
+    {
+        "command": "help",
+        "description": "Show help message"
+    },
+    {
+        "command": "submit_reward",
+        "description": "Submit reward for an instance"
+    },
+    {
+        "command": "clear",
+        "description": "Clear chat history"
+    }
+]
+_GLOBAL_COMMANDS_BODY = orjson.dumps({"commands": BOT_COMMANDS})
+# Per-chat body minus its closing brace; only the chat ID is appended per call
+_CHAT_COMMANDS_PREFIX = _GLOBAL_COMMANDS_BODY[:-1] + b',"chat_id":'
+_JSON_HEADERS = {'Content-Type': 'application/json'}
+
+# setMyCommands endpoint, built from the bot token the first time it is needed
+_set_commands_url: Optional[str] = None
+
+
+def _get_set_commands_url() -> Optional[str]:
+    """Return the setMyCommands URL, or None if the bot token is not configured"""
+    global _set_commands_url
+    if _set_commands_url is None:
+        token = os.environ.get('GROUPWRITE_TELEGRAM_BOT_TOKEN')
+        if token:
+            _set_commands_url = f"https://api.telegram.org/bot{token}/setMyCommands"
+    return _set_commands_url
+
+
+# Seconds to wait for a newly added repository to expose its issue instances
+ISSUE_SYNC_TIMEOUT = 61
+
+# Seconds a looked-up issue and its instance are reused before asking the API again
+ISSUE_CACHE_TTL = 300
+
+# Bounds on the chat history forwarded as instance background
+MAX_HISTORY_MSGS = 20
+MAX_MSG_CHARS = 500
+
+# Issues cached below; warm Lambda processes keep them across invocations
+MAX_CACHED_ISSUES = 1000
+
+# (owner, repo, issue_number) -> (expiry on the monotonic clock, issue)
+_issue_cache: Dict[Tuple[str, str, int], Tuple[float, Dict[str, Any]]] = {}
+
+# Repositories remembered below; warm Lambda processes keep them across invocations
+MAX_CACHED_REPOS = 1000
+
+# Repositories whose issues were served directly, or only via the agentMarketBot fork,
+# in the order they were last seen (dicts used as ordered sets)
+_known_repos: Dict[Tuple[str, str], None] = {}
+_proxy_repos: Dict[Tuple[str, str], None] = {}
+
+
+async def shutdown_bot() -> None:
+    """Close network resources held by the bot"""
+    await close_session()
+
+
+def _format_http_error(e: Exception, context: str) -> str:
+    """Describe an exception for the logs, with response and request details for HTTP errors"""
+    parts = [f"{context}: {e}", f"Traceback: {traceback.format_exc()}"]
+    if isinstance(e, aiohttp.ClientResponseError):
+        parts.append(f"Status Code: {e.status}")
+        parts.append(f"Response Message: {e.message}")
+        parts.append(f"Request URL: {e.request_info.url}")
+        parts.append(f"Request Method: {e.request_info.method}")
+        parts.append(f"Response Headers: {e.headers}")
+    elif isinstance(e, AgentMarketAPIError) and e.status is not None:
+        parts.append(f"Status Code: {e.status}")
+    return "\n".join(parts) + "\n"
 
 
 async def handle_update(update: Dict[str, Any]) -> None:
@@ -45,52 +141,45 @@ async def handle_update(update: Dict[str, Any]) -> None:
             store_message(reaction_message['chat']['id'], reaction_message)
             
     except Exception as e:
-        import traceback
-        error_details = f"Error handling update: {e}\n"
-        error_details += f"Traceback: {traceback.format_exc()}\n"
-        
-        # Get additional details if it's an HTTP error
-        if hasattr(e, 'response') and e.response is not None:
-            response = e.response
-            # Check if response is an object or dict and extract status code
-            if isinstance(response, dict) and 'status_code' in response:
-                error_details += f"Status Code: {response['status_code']}\n"
-            elif hasattr(response, 'status_code'):
-                error_details += f"Status Code: {response.status_code}\n"
-            
-            # Check for text content
-            if isinstance(response, dict) and 'text' in response:
-                error_details += f"Response Content: {response['text']}\n"
-            elif hasattr(response, 'text'):
-                error_details += f"Response Content: {response.text}\n"
-        
-        logger.error(error_details)
+        logger.error(_format_http_error(e, "Error handling update"))
+    finally:
+        # Lambda freezes once the update returns, so persist buffered messages
+        # and deliver queued replies now, side by side
+        await asyncio.gather(run_blocking(flush_messages), message_queue.flush())
+        clear_history_cache()
+
+def _format_history(chat_history: List[Dict[str, Any]]) -> str:
+    """Render the most recent chat history as a 'Previous conversation' block, without GitHub links"""
+    # Strip links before truncating so a cut-off link cannot leave a fragment behind
+    lines = [
+        f"{msg.get('username', 'unknown')}: {GITHUB_LINK_RE.sub('', msg.get('text') or '')[:MAX_MSG_CHARS]}\n"
+        for msg in chat_history[-MAX_HISTORY_MSGS:]
+    ]
+    return "\nPrevious conversation:\n" + "".join(lines)
 
-async def handle_code_request(message: Dict[str, Any]) -> None:
+async def handle_code_request(message: Dict[str, Any], mention: Optional[re.Match] = None) -> None:
     """Handle code request commands"""
     chat_id = message['chat']['id']
-    command_text = message['text'].lower().split('@group_code_bot', 1)[1].strip()
-    
-    chat_history = await get_chat_history(chat_id)
-    
-    conversation = "\nPrevious conversation:\n"
-    for msg in chat_history:
-        username = msg.get('username', 'unknown')
-        text = msg.get('text', '')
-        # Remove GitHub links
-        text = re.sub(r'https?://github\.com/\S+', '', text)
-        text = re.sub(r'github\.com/\S+', '', text)
-        conversation += f"{username}: {text}\n"
-    
-    command_text = f"{command_text}\n{conversation}"
+    text = message['text']
+    if mention is None:
+        mention = BOT_NAME_RE.search(text)
+    # Keep the request text as the user wrote it
+    command_text = text[mention.end():].strip()
     
+    # Reject empty requests before paying for the history lookup
     if not command_text:
-        send_message(
+        await message_queue.enqueue(
             chat_id,
             "❌ Please provide a code request description after the command.",
         )
         return
 
+    chat_history = await get_chat_history(chat_id)
+    
+    conversation = _format_history(chat_history)
+    
+    command_text = f"{command_text}\n{conversation}"
+
     instance_data = {
         "background": command_text,
         "max_credit_per_instance": 0.04,
@@ -100,154 +189,168 @@ async def handle_code_request(message: Dict[str, Any]) -> None:
         "allowed_providers": ["0c55fa9b-c831-4b6c-bd7e-ab6f2bf27c65", "a412a4d9-a47d-45ee-956a-7050bd3f955d"]
     }
     
-    async with AgentMarketClient() as client:
-        response = await client.create_instance(instance_data)
+    response = await get_client().create_instance(instance_data)
     instance_id = response['id']
             
-    tracker = RequestTracker()
+    tracker = RequestTracker.instance()
+    # Only report success once the instance is tracked, or provider replies would never be relayed
     await tracker.add_request(instance_id, chat_id)
-        
-    try:
-        # First try with simple formatting
-        send_message(
-            chat_id,
-            f"✅ Instance created!\n\n"
-            f"🔍 Instance ID: {instance_id}\n"
-        )
-    except Exception as e:
-        logger.error(f"Failed to send instance creation message: {e}")
-        # Fallback to even simpler message if needed
-        send_message(
-            chat_id,
-            f"✅ Instance created with ID: {instance_id}"
+    await message_queue.enqueue(
+        chat_id,
+        f"✅ Instance created!\n\n"
+        f"🔍 Instance ID: {instance_id}\n"
+    )
+
+def _remember_repo(repos: Dict[Tuple[str, str], None], key: Tuple[str, str]) -> None:
+    """Mark a repository as most recently seen, forgetting the oldest past the cap"""
+    repos.pop(key, None)
+    repos[key] = None
+    if len(repos) > MAX_CACHED_REPOS:
+        del repos[next(iter(repos))]
+
+async def _get_repository_issues(
+    client: AgentMarketClient, owner: str, repo: str, issue_number: int
+) -> Optional[List[Dict[str, Any]]]:
+    """Fetch issues for a repository, falling back to the agentMarketBot fork.
+
+    Remembers which URL served each repository so later links skip the
+    lookup that is known to fail. Returns None if neither URL is registered.
+    """
+    key = (owner, repo)
+    if key not in _proxy_repos:
+        issues = await client.get_repository_issues(
+            repo_url=f"https://github.com/{owner}/{repo}/issues/{issue_number}"
         )
+        if issues is not None:
+            _remember_repo(_known_repos, key)
+            return issues
+        if key in _known_repos:
+            return None
+    issues = await client.get_repository_issues(
+        repo_url=f"https://github.com/agentMarketBot/{repo}/issues/{issue_number}"
+    )
+    if issues is not None:
+        _remember_repo(_proxy_repos, key)
+    return issues
+
+async def _fetch_issue(
+    client: AgentMarketClient, owner: str, repo: str, issue_number: int
+) -> Optional[Dict[str, Any]]:
+    """Fetch a tracked issue from its repository or the agentMarketBot fork"""
+    cached = _issue_cache.get((owner, repo, issue_number))
+    if cached is not None and cached[0] > time.monotonic():
+        return cached[1]
+    issues = await _get_repository_issues(client, owner, repo, issue_number)
+    if issues is None:
+        return None
+    return _cache_issues(owner, repo, issues).get(issue_number)
 
-async def handle_github_issue_link(message: Dict[str, Any]) -> None:
+def _cache_issues(owner: str, repo: str, issues: List[Dict[str, Any]]) -> Dict[int, Dict[str, Any]]:
+    """Index issues by number, caching those that already have an instance"""
+    now = time.monotonic()
+    expires = now + ISSUE_CACHE_TTL
+    issues_by_number = {issue['issue_number']: issue for issue in issues}
+    for number, issue in issues_by_number.items():
+        if issue.get('instance_id'):
+            key = (owner, repo, number)
+            # Re-insert so the cache stays ordered oldest first
+            _issue_cache.pop(key, None)
+            _issue_cache[key] = (expires, issue)
+    if len(_issue_cache) > MAX_CACHED_ISSUES:
+        # Drop expired entries first, then the oldest ones if that is not enough
+        for key in [key for key, (expiry, _) in _issue_cache.items() if expiry <= now]:
+            del _issue_cache[key]
+        while len(_issue_cache) > MAX_CACHED_ISSUES:
+            del _issue_cache[next(iter(_issue_cache))]
+    return issues_by_number
+
+async def handle_github_issue_link(
+    message: Dict[str, Any], match: Optional[re.Match] = None
+) -> None:
     """Handle GitHub issue link detection using authorized endpoints."""
     chat_id = message['chat']['id']
-    match = re.search(GITHUB_ISSUE_PATTERN, message['text'])
-    if not match:
-        return
+    if match is None:
+        text = message['text']
+        # Cheap substring check first; most GitHub links are not issue links
+        if '/issues/' not in text:
+            return
+        match = GITHUB_ISSUE_RE.search(text)
+        if not match:
+            return
         
     owner, repo, issue_num = match.groups()
     repo_url = f"https://github.com/{owner}/{repo}"
     issue_number = int(issue_num)
     
-    async with AgentMarketClient() as client:
+    client = get_client()
+    try:
+        # Include 'issue_url' in repo_data instead of 'issue_number'
+        issue_url = f"{repo_url}/issues/{issue_number}"
+        repo_data = {
+            "repo_url": issue_url,
+            "default_reward": 0.04,
+        }
+        cached = _issue_cache.get((owner, repo, issue_number))
+        if cached is not None and cached[0] > time.monotonic():
+            return
+        issues = await _get_repository_issues(client, owner, repo, issue_number)
+        if issues is not None:
+            _cache_issues(owner, repo, issues)
+            return
         try:
-            # Include 'issue_url' in repo_data instead of 'issue_number'
-            issue_url = f"{repo_url}/issues/{issue_number}"
-            repo_data = {
-                "repo_url": issue_url,
-                "default_reward": 0.04,
-            }
-            try:
-                try:
-                    issues = await client.get_repository_issues(repo_url=issue_url)
-                    return
-                except Exception as e:
-                    repo_url = repo_url.replace(owner, 'agentMarketBot') 
-                    issue_url = f"{repo_url}/issues/{issue_number}"
-                    issues = await client.get_repository_issues(repo_url=issue_url)
-                    return
-            except Exception as e:
-                pass
-            try:
-                await client.add_repository(repo_data)
-            except Exception as e:
-                logger.error(f"Error adding repository: {e}")
-                send_message(
-                    chat_id,
-                    f"❌ Failed to process GitHub issue {e}. Please try again later.",
-                )
-                return 
-
-            time.sleep(61)
+            await client.add_repository(repo_data)
+        except Exception as e:
+            logger.error(f"Error adding repository: {e}")
+            await message_queue.enqueue(
+                chat_id,
+                f"❌ Failed to process GitHub issue {e}. Please try again later.",
+            )
+            return 
 
+        # Poll with exponential backoff while the repository syncs instead
+        # of sleeping for the full window, so the issue is picked up as soon
+        # as its instance exists.
+        delay, waited = 1, 0
+        while True:
+            await asyncio.sleep(delay)
+            waited += delay
             try:
-                repo_url = f"https://github.com/{owner}/{repo}"
-                issue_url = f"{repo_url}/issues/{issue_number}"
-                issues = await client.get_repository_issues(repo_url=issue_url)
-            except Exception as e:
-                repo_url = repo_url.replace(owner, 'agentMarketBot') 
-                issue_url = f"{repo_url}/issues/{issue_number}"
-                issues = await client.get_repository_issues(repo_url=issue_url)
-            issue = next((issue for issue in issues if issue['issue_number'] == issue_number), None)
-
-            if not issue or not issue.get('instance_id'):
-                send_message(
-                    chat_id,
-                    f"❌ Instance for issue #{issue_number} not found.",
-                )
-                return
-
-            instance_id = issue['instance_id']
-            
-            tracker = RequestTracker()
-            await tracker.add_request(instance_id, chat_id)
+                issue = await _fetch_issue(client, owner, repo, issue_number)
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                # A transient failure mid-poll only matters once we are out of time
+                if waited >= ISSUE_SYNC_TIMEOUT:
+                    raise
+                issue = None
+            if (issue and issue.get('instance_id')) or waited >= ISSUE_SYNC_TIMEOUT:
+                break
+            delay = min(delay * 2, ISSUE_SYNC_TIMEOUT - waited)
 
-            try:
-                issue_body = issue.get('body', 'No description provided.')
-                check_mark = "✅"
-                # Try first with MarkdownV2 formatting
-                message_text = (
-                    f"{check_mark} Created instance `{instance_id}` from GitHub issue {issue_number}\n\n"
-                    f"*Title:* {issue['title']}\n"
-                    f"*Description:*\n{issue_body}\n"
-                )
-                send_message(
-                    chat_id,
-                    message_text,
-                    parse_mode='MarkdownV2'
-                )
-            except Exception as e:
-                logger.error(f"Failed to send formatted GitHub issue message: {e}")
-                # Fallback to plain text with no markdown
-                plain_message = (
-                    f"✅ Created instance {instance_id} from GitHub issue {issue_number}\n\n"
-                    f"Title: {issue['title']}\n"
-                    f"Description:\n{issue_body}\n"
-                )
-                send_message(chat_id, plain_message)
-        except Exception as e:
-            import traceback
-            error_details = f"Error handling GitHub issue: {e}\n"
-            error_details += f"Traceback: {traceback.format_exc()}\n"
-            
-            # Get additional details if it's an HTTP error
-            if hasattr(e, 'response') and e.response is not None:
-                response = e.response
-                # Check if response is an object or dict and extract status code
-                if isinstance(response, dict) and 'status_code' in response:
-                    error_details += f"Status Code: {response['status_code']}\n"
-                elif hasattr(response, 'status_code'):
-                    error_details += f"Status Code: {response.status_code}\n"
-                
-                # Check for text content
-                if isinstance(response, dict) and 'text' in response:
-                    error_details += f"Response Content: {response['text']}\n"
-                elif hasattr(response, 'text'):
-                    error_details += f"Response Content: {response.text}\n"
-                
-                # Add URL, method, headers, and body if available
-                if isinstance(response, dict) and 'url' in response:
-                    error_details += f"Request URL: {response['url']}\n"
-                elif hasattr(response, 'url'):
-                    error_details += f"Request URL: {response.url}\n"
-                
-                if hasattr(e.response, 'request') and e.response.request is not None:
-                    if hasattr(e.response.request, 'method'):
-                        error_details += f"Request Method: {e.response.request.method}\n"
-                    if hasattr(e.response.request, 'headers'):
-                        error_details += f"Request Headers: {e.response.request.headers}\n"
-                    if hasattr(e.response.request, 'body'):
-                        error_details += f"Request Body: {e.response.request.body}\n"
-            
-            logger.error(error_details)
-            send_message(
+        if not issue or not issue.get('instance_id'):
+            await message_queue.enqueue(
                 chat_id,
-                f"❌ Failed to process GitHub issue: {str(e)}. Please try again later.",
+                f"❌ Instance for issue #{issue_number} not found.",
             )
+            return
+
+        instance_id = issue['instance_id']
+            
+        tracker = RequestTracker.instance()
+        await tracker.add_request(instance_id, chat_id)
+
+        issue_body = issue.get('body', 'No description provided.')
+        # Only the issue fields need escaping; the template's markup is kept
+        message_text = (
+            f"✅ Created instance `{escape_markdown(instance_id)}` from GitHub issue {issue_number}\n\n"
+            f"*Title:* {escape_markdown(issue['title'])}\n"
+            f"*Description:*\n{escape_markdown(issue_body)}\n"
+        )
+        await message_queue.enqueue(chat_id, message_text, parse_mode='MarkdownV2', escaped=True)
+    except Exception as e:
+        logger.error(_format_http_error(e, "Error handling GitHub issue"))
+        await message_queue.enqueue(
+            chat_id,
+            f"❌ Failed to process GitHub issue: {str(e)}. Please try again later.",
+        )
 
 async def handle_new_chat_members(message: Dict[str, Any]) -> None:
     """Handle new members joining the chat"""
@@ -255,20 +358,12 @@ async def handle_new_chat_members(message: Dict[str, Any]) -> None:
     for member in message['new_chat_members']:
         if member.get('username') == "group_code_bot":
             try:
-                set_bot_commands(chat_id)
+                await set_bot_commands(chat_id)
                 # Add small delay before sending welcome message to ensure bot is fully initialized in the chat
                 await asyncio.sleep(1)
                 
-                # First try with no formatting to ensure the message gets delivered
-                try:
-                    # Remove markdown formatting symbols from welcome message
-                    plain_welcome = WELCOME_MESSAGE.replace('*', '').replace('`', '')
-                    send_message(chat_id, plain_welcome)
-                except Exception as e:
-                    logger.error(f"Failed to send plain welcome message to chat {chat_id}: {e}")
-                    # Fallback to even simpler message if plain message fails
-                    simple_message = "👋 Welcome to Group Code Bot! Type /help to see available commands."
-                    send_message(chat_id, simple_message)
+                # Send with no formatting to ensure the message gets delivered
+                await message_queue.enqueue(chat_id, PLAIN_WELCOME_MESSAGE)
             except Exception as e:
                 logger.error(f"Failed to send welcome message to chat {chat_id}: {e}")
                 # We'll log but not re-raise the error to prevent the function from failing completely
@@ -278,31 +373,22 @@ async def handle_provider_reply(message: Dict[str, Any], replied_msg: Dict[str,
     chat_id = message['chat']['id']
     text = message['text']
     
-    if 'text' not in replied_msg or 'message from' not in replied_msg['text'].lower():
+    match = PROVIDER_REPLY_RE.search(replied_msg.get('text', ''))
+    if not match:
         return False
-        
-    try:
-        provider_id = replied_msg['text'].split('(')[1].split(')')[0]
-        instance_info = replied_msg['text'].split('for instance: ')[1]
-        instance_id = re.search(r'\b[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\b', instance_info).group(0)
+    provider_id, instance_id = match.groups()
 
+    try:
         chat_history = await get_chat_history(chat_id)
     
-        conversation = "\nPrevious conversation:\n"
-        for msg in chat_history:
-            username = msg.get('username', 'unknown')
-            text = msg.get('text', '')
-            # Remove GitHub links
-            text = re.sub(r'https?://github\.com/\S+', '', text)
-            text = re.sub(r'github\.com/\S+', '', text)
-            conversation += f"{username}: {text}\n"
+        conversation = _format_history(chat_history)
 
         text = f"{text}\n{conversation}"
 
         await send_message_to_provider(chat_id, provider_id, text, instance_id=instance_id)
         return True
-    except (IndexError, ValueError):
-        logger.error("Failed to parse provider or instance ID from message")
+    except ValueError as e:
+        logger.error(f"Failed to forward reply to provider: {e}")
         return False
 
 async def handle_provider_mention(message: Dict[str, Any]) -> bool:
@@ -321,14 +407,7 @@ async def handle_provider_mention(message: Dict[str, Any]) -> bool:
 
     chat_history = await get_chat_history(chat_id)
     
-    conversation = "\nPrevious conversation:\n"
-    for msg in chat_history:
-        username = msg.get('username', 'unknown')
-        text = msg.get('text', '')
-        # Remove GitHub links
-        text = re.sub(r'https?://github\.com/\S+', '', text)
-        text = re.sub(r'github\.com/\S+', '', text)
-        conversation += f"{username}: {text}\n"
+    conversation = _format_history(chat_history)
 
     message_content = f"{message_content}\n{conversation}"
     
@@ -344,8 +423,9 @@ async def handle_message(message: Dict[str, Any]) -> None:
     if 'text' not in message:
         return
 
-    if 'reply_to_message' in message:
-        replied_to_bot = message['reply_to_message'].get('from', {}).get('username') == 'group_code_bot'
+    reply_to = message.get('reply_to_message')
+    if reply_to is not None:
+        replied_to_bot = reply_to.get('from', {}).get('username') == 'group_code_bot'
         if not replied_to_bot:
             message['text'] = add_chat_id_if_reply(message)
     
@@ -358,66 +438,62 @@ async def handle_message(message: Dict[str, Any]) -> None:
     # Handle commands first
     if text.startswith('/'):
         # Extract the command by removing the @ portion if present
-        command = text.split('@')[0]  # This will convert "/help@group_code_bot" to "help"
+        command = text.split(None, 1)[0]
+        at = command.find('@')
+        if at >= 0:
+            command = command[:at]  # This will convert "/help@group_code_bot" to "/help"
         await handle_command(message, command)
         return
     
     # Handle replies to provider messages
-    if 'reply_to_message' in message:
-        if await handle_provider_reply(message, message['reply_to_message']):
+    if reply_to is not None:
+        if await handle_provider_reply(message, reply_to):
             return
+
+    # Everything below needs a mention or an issue link; most chatter has neither
+    if '@' not in text and '/issues/' not in text:
+        return
             
     # Handle provider mentions
     if await handle_provider_mention(message):
         return
 
     # Handle non-command messages
-    if '@group_code_bot' in text.lower():
-        await handle_code_request(message)
-        return
-    elif re.search(GITHUB_ISSUE_PATTERN, text):
-        await handle_github_issue_link(message)
+    mention = BOT_NAME_RE.search(text)
+    if mention:
+        await handle_code_request(message, mention)
         return
+    if '/issues/' in text:
+        issue_match = GITHUB_ISSUE_RE.search(text)
+        if issue_match:
+            await handle_github_issue_link(message, issue_match)
+            return
     
 
 def parse_bot_mention(text: str) -> Optional[str]:
     """Extract command text from bot mention"""
-    match = re.search(BOT_MENTION_PATTERN, text)
+    match = BOT_MENTION_RE.search(text)
     return match.group(1) if match else None
 
 
 async def handle_command(message: Dict[str, Any], command: str) -> bool:
     """Handle bot commands"""
+    handler = _COMMANDS.get(command)
+    if handler is None:
+        return False
+    await handler(message)
+    return True
+
+async def handle_help(message: Dict[str, Any]) -> None:
+    """Handle the help command"""
+    # Send plain message without formatting
+    await message_queue.enqueue(message['chat']['id'], PLAIN_HELP_MESSAGE)
+
+async def handle_clear(message: Dict[str, Any]) -> None:
+    """Handle the clear command"""
     chat_id = message['chat']['id']
-    
-    if command.startswith('/help'):
-        try:
-            # Try to send plain message without formatting
-            plain_help = HELP_MESSAGE.replace('*', '').replace('`', '')
-            send_message(chat_id, plain_help)
-        except Exception as e:
-            logger.error(f"Failed to send help message to chat {chat_id}: {e}")
-            # Fallback to much simpler help message
-            simple_help = "Available commands:\n/help - Show this message\n/clear - Clear chat history\n/submit_reward - Submit reward for completed task"
-            send_message(chat_id, simple_help)
-        return True
-        
-    if command.startswith('/submit_reward'):
-        await handle_submit_reward(message)
-        return True
-        
-    if command.startswith('/clear'):
-        await clear_chat_history(chat_id)
-        try:
-            # Try with the template from success messages
-            send_message(chat_id, SUCCESS_MESSAGES["history_cleared"].template)
-        except Exception as e:
-            logger.error(f"Failed to send clear history confirmation message: {e}")
-            # Fallback to simpler message
-            send_message(chat_id, "✅ Chat history cleared successfully!")
-        return True
-        
-    return False
+    await clear_chat_history(chat_id)
+    await message_queue.enqueue(chat_id, SUCCESS_MESSAGES["history_cleared"])
 
 async def handle_submit_reward(message: Dict[str, Any]) -> None:
     """Handle the submit_reward command"""
@@ -425,192 +501,63 @@ async def handle_submit_reward(message: Dict[str, Any]) -> None:
     parts = message['text'].split()
     
     if len(parts) != 3:
-        send_message(chat_id, INVALID_REWARD_FORMAT)
+        await message_queue.enqueue(chat_id, INVALID_REWARD_FORMAT)
         return
         
     instance_id = parts[1]
     try:
         amount = float(parts[2].replace(',', '.'))
-        async with AgentMarketClient() as client:
-            await client.report_reward(instance_id, amount)
-        
-        try:
-            # Try to send formatted success message
-            send_message(chat_id, REWARD_SUCCESS.format(amount=amount, instance_id=instance_id))
-        except Exception as e:
-            logger.error(f"Failed to send reward success message: {e}")
-            # Fallback to simpler message
-            send_message(chat_id, f"✅ Successfully submitted reward of {amount} for instance {instance_id}")
+        await get_client().report_reward(instance_id, amount)
+        await message_queue.enqueue(chat_id, SUCCESS_FORMATTERS['reward_submitted'](amount, instance_id))
     except ValueError:
-        send_message(chat_id, "❌ Amount must be a valid number")
+        await message_queue.enqueue(chat_id, "❌ Amount must be a valid number")
     except Exception as e:
-        import traceback
-        error_details = f"Error submitting reward: {e}\n"
-        error_details += f"Traceback: {traceback.format_exc()}\n"
-        
-        # Get additional details if it's an HTTP error
-        if hasattr(e, 'response') and e.response is not None:
-            response = e.response
-            # Check if response is an object or dict and extract status code
-            if isinstance(response, dict) and 'status_code' in response:
-                error_details += f"Status Code: {response['status_code']}\n"
-            elif hasattr(response, 'status_code'):
-                error_details += f"Status Code: {response.status_code}\n"
-            
-            # Check for text content
-            if isinstance(response, dict) and 'text' in response:
-                error_details += f"Response Content: {response['text']}\n"
-            elif hasattr(response, 'text'):
-                error_details += f"Response Content: {response.text}\n"
-            
-            # Add URL, method, headers, and body if available
-            if isinstance(response, dict) and 'url' in response:
-                error_details += f"Request URL: {response['url']}\n"
-            elif hasattr(response, 'url'):
-                error_details += f"Request URL: {response.url}\n"
-                
-            if hasattr(e.response, 'request') and e.response.request is not None:
-                if hasattr(e.response.request, 'method'):
-                    error_details += f"Request Method: {e.response.request.method}\n"
-                if hasattr(e.response.request, 'headers'):
-                    error_details += f"Request Headers: {e.response.request.headers}\n"
-                if hasattr(e.response.request, 'body'):
-                    error_details += f"Request Body: {e.response.request.body}\n"
-        
-        logger.error(error_details)
-        send_message(chat_id, f"❌ Failed to submit reward: {str(e)}")
+        logger.error(_format_http_error(e, "Error submitting reward"))
+        await message_queue.enqueue(chat_id, f"❌ Failed to submit reward: {str(e)}")
+
+# Command handlers keyed by the command's first token, without any @bot suffix
+_COMMANDS = {
+    '/help': handle_help,
+    '/submit_reward': handle_submit_reward,
+    '/clear': handle_clear
+}
 
 async def initialize_bot() -> None:
     """Initialize bot settings and configurations"""
     logger.info("Initializing bot...")
     
     # Set up default commands for the bot
-    token = os.environ.get('GROUPWRITE_TELEGRAM_BOT_TOKEN')
-    if not token:
+    commands_url = _get_set_commands_url()
+    if not commands_url:
         logger.error("Bot token not found in environment variables")
         return
         
-    # Set global bot commands
-    commands_url = f"https://api.telegram.org/bot{token}/setMyCommands"
-    commands = [
-        {
-            "command": "help",
-            "description": "Show help message"
-        },
-        {
-            "command": "submit_reward",
-            "description": "Submit reward for an instance"
-        },
-        {
-            "command": "clear",
-            "description": "Clear chat history"
-        }
-    ]
-    
     try:
-        response = requests.post(commands_url, json={"commands": commands})
-        response.raise_for_status()
+        async with get_session().post(
+            commands_url, data=_GLOBAL_COMMANDS_BODY, headers=_JSON_HEADERS
+        ) as response:
+            response.raise_for_status()
         logger.info("Successfully set global bot commands")
     except Exception as e:
-        import traceback
-        error_details = f"Failed to set bot commands: {e}\n"
-        error_details += f"Traceback: {traceback.format_exc()}\n"
-        
-        # Get additional details if it's an HTTP error
-        if hasattr(e, 'response') and e.response is not None:
-            response = e.response
-            # Check if response is an object or dict and extract status code
-            if isinstance(response, dict) and 'status_code' in response:
-                error_details += f"Status Code: {response['status_code']}\n"
-            elif hasattr(response, 'status_code'):
-                error_details += f"Status Code: {response.status_code}\n"
-            
-            # Check for text content
-            if isinstance(response, dict) and 'text' in response:
-                error_details += f"Response Content: {response['text']}\n"
-            elif hasattr(response, 'text'):
-                error_details += f"Response Content: {response.text}\n"
-            
-            # Add URL, method, headers, and body if available
-            if isinstance(response, dict) and 'url' in response:
-                error_details += f"Request URL: {response['url']}\n"
-            elif hasattr(response, 'url'):
-                error_details += f"Request URL: {response.url}\n"
-                
-            if hasattr(e.response, 'request') and e.response.request is not None:
-                if hasattr(e.response.request, 'method'):
-                    error_details += f"Request Method: {e.response.request.method}\n"
-                if hasattr(e.response.request, 'headers'):
-                    error_details += f"Request Headers: {e.response.request.headers}\n"
-                if hasattr(e.response.request, 'body'):
-                    error_details += f"Request Body: {e.response.request.body}\n"
-        
-        logger.error(error_details)
+        logger.error(_format_http_error(e, "Failed to set bot commands"))
 
-def set_bot_commands(chat_id: int) -> None:
+async def set_bot_commands(chat_id: int) -> None:
     """Set up the bot's commands for a group chat with proper scope and language support."""
     
-    commands = [
-        {
-            "command": "help",
-            "description": "Show help message"
-        },
-        {
-            "command": "submit_reward",
-            "description": "Submit reward for an instance"
-        },
-        {
-            "command": "clear",
-            "description": "Clear chat history"
-        }
-    ]
-    
-    token = os.environ['GROUPWRITE_TELEGRAM_BOT_TOKEN']
+    commands_url = _get_set_commands_url()
+    if not commands_url:
+        logger.error("Bot token not found in environment variables")
+        return
     
     # Set commands with proper scope for the specific group chat
-    commands_url = f"https://api.telegram.org/bot{token}/setMyCommands"
     # Commands by chat_id
-    commands_payload = {
-        "commands": commands,
-        "chat_id": chat_id
-    }
+    commands_body = b"%s%d}" % (_CHAT_COMMANDS_PREFIX, chat_id)
     
     try:
-        commands_response = requests.post(commands_url, json=commands_payload)
-        commands_response.raise_for_status()  # Raise exception for non-200 status codes
-        logger.info(f"Successfully set commands for chat {chat_id}")
+        async with get_session().post(
+            commands_url, data=commands_body, headers=_JSON_HEADERS
+        ) as commands_response:
+            commands_response.raise_for_status()  # Raise exception for non-200 status codes
+        logger.info("Successfully set commands for chat {}", chat_id)
     except Exception as e:
-        import traceback
-        error_details = f"Error setting commands for chat {chat_id}: {e}\n"
-        error_details += f"Traceback: {traceback.format_exc()}\n"
-        
-        # Get additional details if it's an HTTP error
-        if hasattr(e, 'response') and e.response is not None:
-            response = e.response
-            # Check if response is an object or dict and extract status code
-            if isinstance(response, dict) and 'status_code' in response:
-                error_details += f"Status Code: {response['status_code']}\n"
-            elif hasattr(response, 'status_code'):
-                error_details += f"Status Code: {response.status_code}\n"
-            
-            # Check for text content
-            if isinstance(response, dict) and 'text' in response:
-                error_details += f"Response Content: {response['text']}\n"
-            elif hasattr(response, 'text'):
-                error_details += f"Response Content: {response.text}\n"
-            
-            # Add URL, method, headers, and body if available
-            if isinstance(response, dict) and 'url' in response:
-                error_details += f"Request URL: {response['url']}\n"
-            elif hasattr(response, 'url'):
-                error_details += f"Request URL: {response.url}\n"
-                
-            if hasattr(e.response, 'request') and e.response.request is not None:
-                if hasattr(e.response.request, 'method'):
-                    error_details += f"Request Method: {e.response.request.method}\n"
-                if hasattr(e.response.request, 'headers'):
-                    error_details += f"Request Headers: {e.response.request.headers}\n"
-                if hasattr(e.response.request, 'body'):
-                    error_details += f"Request Body: {e.response.request.body}\n"
-        
-        logger.error(error_details)
+        logger.error(_format_http_error(e, f"Error setting commands for chat {chat_id}"))
@@ -1,41 +1,68 @@
 import asyncio
+import atexit
 import os
 from datetime import datetime
 from typing import List, Dict, Any, Optional
 from services.request_tracker import RequestTracker
-from services.client import AgentMarketClient
+from services.client import get_client
 from utils.message_utils import process_instance_messages
-from bot_handlers import handle_update
+from bot_handlers import handle_update, shutdown_bot
+from services.bot.message_queue import message_queue
 from loguru import logger
 from datetime import datetime, timedelta
-import json
+import boto3
+import orjson
 
 _RESOLVED_STATUS = 3
 
+# Instances whose provider messages are processed at the same time
+_MAX_CONCURRENT_INSTANCES = 20
+
+# detail-type of events carrying a Telegram update for asynchronous processing
+_TELEGRAM_UPDATE = 'telegram_update'
+
 async def process_provider_messages(event=None, context=None):
     """Process new messages from providers for all active instances."""
     try:
-        request_tracker = RequestTracker()
-        async with AgentMarketClient() as client:
-            active_instances = await client.get_instances(instance_status=_RESOLVED_STATUS)
-
-            for instance in active_instances:
-                instance_id = instance['id']
-                last_processed_timestamp = request_tracker.get_last_processed_time(instance_id)
-                
+        request_tracker = RequestTracker.instance()
+        client = get_client()
+        active_instances = await client.get_instances(instance_status=_RESOLVED_STATUS)
+        # Read every tracked request up front instead of two get_item calls per instance
+        tracked = await request_tracker.get_many([instance['id'] for instance in active_instances])
+        # Bound concurrency so a long instance list does not flood the API
+        semaphore = asyncio.Semaphore(_MAX_CONCURRENT_INSTANCES)
+
+        async def process_instance(instance_id: str) -> None:
+            item = tracked.get(str(instance_id))
+            if item is None or item.get('chat_id') is None:
+                return
+            async with semaphore:
+                last_processed_timestamp = int(item.get('last_processed_time', 0))
+
                 new_timestamp = await process_instance_messages(
                     client,
                     request_tracker,
                     instance_id,
-                    last_processed_timestamp
+                    last_processed_timestamp,
+                    chat_id=int(item['chat_id'])
                 )
 
                 if new_timestamp:
-                    logger.info(f"Updating last processed timestamp for instance {instance_id}")
-                    request_tracker.update_last_processed_time(instance_id, new_timestamp)
+                    logger.info("Updating last processed timestamp for instance {}", instance_id)
+                    await request_tracker.update_last_processed_time(instance_id, new_timestamp)
+
+        results = await asyncio.gather(
+            *(process_instance(instance['id']) for instance in active_instances),
+            return_exceptions=True
+        )
+        for instance, result in zip(active_instances, results):
+            if isinstance(result, Exception):
+                logger.error(f"Error processing instance {instance['id']}: {result}")
 
     except Exception as e:
         logger.error(f"Error in process_provider_messages: {e}")
+    finally:
+        await message_queue.flush()
 
 class ApplicationConfig:
     def __init__(self):
@@ -43,23 +70,67 @@ class ApplicationConfig:
         self.agent_market_api_key = os.environ['AGENT_MARKET_API_KEY']
         self.openai_api_key = os.environ['OPENAI_API_KEY']
 
+# Event loop kept across warm Lambda invocations so the shared HTTP session
+# and its pooled connections stay usable between requests
+_loop: Optional[asyncio.AbstractEventLoop] = None
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    """Return the process-wide event loop, creating it on first use"""
+    global _loop
+    if _loop is None or _loop.is_closed():
+        _loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(_loop)
+    return _loop
+
+@atexit.register
+def _close_loop() -> None:
+    """Close the shared HTTP session and event loop when the process exits"""
+    if _loop is not None and not _loop.is_closed():
+        _loop.run_until_complete(shutdown_bot())
+        _loop.close()
+
+# Lambda client used to hand webhook updates off to an asynchronous invocation
+_lambda_client = None
+
+def _get_lambda_client():
+    """Return the shared Lambda client, creating it on first use"""
+    global _lambda_client
+    if _lambda_client is None:
+        _lambda_client = boto3.client('lambda')
+    return _lambda_client
+
+def _dispatch_update(update: Dict[str, Any], context) -> bool:
+    """Re-invoke this function asynchronously to process the update.
+
+    Returns False if the update could not be handed off and should be
+    handled in the current invocation instead.
+    """
+    if context is None:
+        return False
+    try:
+        _get_lambda_client().invoke(
+            FunctionName=context.invoked_function_arn,
+            InvocationType='Event',
+            Payload=orjson.dumps({'detail-type': _TELEGRAM_UPDATE, 'update': update})
+        )
+        return True
+    except Exception as e:
+        logger.error(f"Failed to dispatch update for async processing: {e}")
+        return False
+
 def handler(event, context):
     # Check if this is an EventBridge scheduled event
-    logger.info(f"Received event: {event}")
+    logger.info("Received event: {}", event)
     if event.get('detail-type') == 'process_provider_messages':
-        # Create a new event loop for the async function
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            return loop.run_until_complete(process_provider_messages(event, context))
-        finally:
-            loop.close()
+        return _get_loop().run_until_complete(process_provider_messages(event, context))
+    elif event.get('detail-type') == _TELEGRAM_UPDATE:
+        # Update handed off by the webhook invocation below
+        return _get_loop().run_until_complete(handle_update(event['update']))
     else:
         logger.info("Received regular API Gateway request")
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            return loop.run_until_complete(handle_update(json.loads(event['body'])))
-        finally:
-            loop.close()
-
+        update = orjson.loads(event['body'])
+        # Acknowledge the webhook right away so Telegram does not retry while
+        # slow flows (e.g. waiting for a GitHub issue to sync) are running
+        if not _dispatch_update(update, context):
+            _get_loop().run_until_complete(handle_update(update))
+        return {'statusCode': 200}
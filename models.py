@@ -5,10 +5,10 @@ used throughout the application, particularly for Telegram API interactions and
 instance tracking.
 """
 
-from typing import Optional, Dict, Any, TypedDict, List, Union
+from typing import Optional, Dict, Any, TypedDict, List, Literal, Union
 from datetime import datetime
 from uuid import UUID
-from pydantic import BaseModel, Field, validator, HttpUrl
+from pydantic import BaseModel, ConfigDict, Field, field_validator
 
 # Type aliases for Telegram types
 TelegramUpdate = Dict[str, Any]  # Base type for Telegram updates
@@ -16,10 +16,18 @@ TelegramMessage = Dict[str, Any]  # Type for message objects
 TelegramUser = Dict[str, Any]    # Type for user objects
 TelegramChat = Dict[str, Any]    # Type for chat objects
 
-class RequestMetadata(BaseModel):
+# Lifecycle states of an instance request
+RequestStatus = Literal["pending", "active", "completed", "failed"]
+
+class _DeferredModel(BaseModel):
+    """Base for the models below; schemas are built on first use rather than at import."""
+
+    model_config = ConfigDict(defer_build=True)
+
+class RequestMetadata(_DeferredModel):
     """Metadata associated with an instance request."""
     
-    github_issue_url: Optional[HttpUrl] = Field(
+    github_issue_url: Optional[str] = Field(
         None, 
         description="URL of associated GitHub issue"
     )
@@ -32,7 +40,7 @@ class RequestMetadata(BaseModel):
         description="Custom labels for the request"
     )
 
-class TelegramUserModel(BaseModel):
+class TelegramUserModel(_DeferredModel):
     """Model representing a Telegram user."""
     
     id: int = Field(..., description="Telegram user ID")
@@ -42,7 +50,7 @@ class TelegramUserModel(BaseModel):
     username: Optional[str] = Field(None, description="User's username")
     language_code: Optional[str] = Field(None, description="User's language code")
 
-class TelegramChatModel(BaseModel):
+class TelegramChatModel(_DeferredModel):
     """Model representing a Telegram chat."""
     
     id: int = Field(..., description="Telegram chat ID")
@@ -50,7 +58,7 @@ class TelegramChatModel(BaseModel):
     title: Optional[str] = Field(None, description="Chat title for groups")
     username: Optional[str] = Field(None, description="Username for private chats")
 
-class TelegramMessageModel(BaseModel):
+class TelegramMessageModel(_DeferredModel):
     """Model representing a Telegram message."""
     
     message_id: int = Field(..., description="Unique message identifier")
@@ -60,13 +68,13 @@ class TelegramMessageModel(BaseModel):
     text: Optional[str] = Field(None, description="Message text if any")
     reply_to_message: Optional['TelegramMessageModel'] = None
 
-class TelegramUpdateModel(BaseModel):
+class TelegramUpdateModel(_DeferredModel):
     """Model representing a Telegram update."""
     
     update_id: int = Field(..., description="Update's unique identifier")
     message: Optional[TelegramMessageModel] = Field(None, description="New message")
 
-class InstanceRequest(BaseModel):
+class InstanceRequest(_DeferredModel):
     """Model representing an instance request."""
     
     instance_id: UUID = Field(
@@ -77,10 +85,9 @@ class InstanceRequest(BaseModel):
         ..., 
         description="Telegram chat ID where request originated"
     )
-    status: str = Field(
+    status: RequestStatus = Field(
         ...,
-        description="Current status of the request",
-        pattern="^(pending|active|completed|failed)$"
+        description="Current status of the request"
     )
     created_at: datetime = Field(
         default_factory=datetime.utcnow,
@@ -91,14 +98,15 @@ class InstanceRequest(BaseModel):
         description="Additional metadata for the request"
     )
 
-    @validator('created_at')
+    @field_validator('created_at')
+    @classmethod
     def ensure_utc(cls, v):
         """Ensure timestamp is in UTC."""
         if v.tzinfo is not None:
             v = v.replace(tzinfo=None)
         return v
 
-class ProviderMessage(BaseModel):
+class ProviderMessage(_DeferredModel):
     """Model representing a message from a provider."""
     
     provider_id: UUID = Field(
@@ -120,11 +128,10 @@ class ProviderMessage(BaseModel):
         description="When the message was sent"
     )
 
-    @validator('timestamp')
+    @field_validator('timestamp')
+    @classmethod
     def ensure_utc(cls, v):
         """Ensure timestamp is in UTC."""
         if v.tzinfo is not None:
             v = v.replace(tzinfo=None)
         return v
-
-TelegramMessageModel.update_forward_refs()
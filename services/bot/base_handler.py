@@ -1,11 +1,22 @@
 """Base handler class for bot message processing."""
 
 from abc import ABC, abstractmethod
-from typing import Any, Dict, Optional
+from typing import Annotated, Any, Dict, Optional, Union
+from pydantic import Field, TypeAdapter
 from .context import MessageContext
-from .message_types import BaseMessage
+from .message_types import BaseMessage, TextMessage, NewChatMemberMessage
 from utils.errors import ValidationError, TelegramError
 
+# Built once at import so validation goes straight to the compiled validator.
+# Members are tried in order, so each update is validated directly into the
+# most specific type the handlers dispatch on, falling back to BaseMessage.
+_MESSAGE_VALIDATOR = TypeAdapter(
+    Annotated[
+        Union[NewChatMemberMessage, TextMessage, BaseMessage],
+        Field(union_mode='left_to_right')
+    ]
+)
+
 class BaseHandler(ABC):
     """Abstract base class for message handlers."""
 
@@ -23,11 +34,11 @@ class BaseHandler(ABC):
         """
         pass
 
-    def validate_message(self, message: Dict[str, Any]) -> BaseMessage:
+    def validate_message(self, message: Union[Dict[str, Any], bytes]) -> BaseMessage:
         """Validate raw message data into typed message object.
         
         Args:
-            message: Raw message dictionary
+            message: Raw message dictionary, or its undecoded JSON bytes
             
         Returns:
             BaseMessage: Validated message object
@@ -36,7 +47,10 @@ class BaseHandler(ABC):
             ValidationError: If validation fails
         """
         try:
-            return BaseMessage.parse_obj(message)
+            if isinstance(message, bytes):
+                # Parse and validate in a single pass without building a dict first
+                return _MESSAGE_VALIDATOR.validate_json(message)
+            return _MESSAGE_VALIDATOR.validate_python(message)
         except Exception as e:
             raise ValidationError(f"Message validation failed: {str(e)}")
 
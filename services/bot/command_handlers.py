@@ -8,17 +8,19 @@ from decimal import Decimal, InvalidOperation
 from typing import Dict, Any, Tuple, Optional
 from loguru import logger
 
-from services.client import AgentMarketClient, AgentMarketAPIError
-from utils.telegram_utils import send_message
+from services.client import AgentMarketAPIError, get_client
+from .message_queue import message_queue
 from utils.errors import error_handler, ValidationError
 from .messages import (
     HELP_MESSAGE,
     ERROR_MESSAGES,
+    ERROR_FORMATTERS,
     SUCCESS_MESSAGES,
+    SUCCESS_FORMATTERS,
     COMMAND_USAGE,
     COMMAND_MESSAGES,
     MessageCategory,
-    Emoji
+    EMOJI_ERROR
 )
 
 class CommandParseError(ValidationError):
@@ -44,7 +46,13 @@ def extract_command_parts(text: str) -> Tuple[str, str]:
     try:
         command_parts = text.strip().split(maxsplit=1)
         # Remove bot username if present (e.g., /command@bot_name)
-        command = command_parts[0].split('@')[0].lower()
+        command = command_parts[0]
+        at = command.find('@')
+        if at >= 0:
+            command = command[:at]
+        # Commands are almost always typed in lowercase already
+        if not command.islower():
+            command = command.lower()
         args = command_parts[1] if len(command_parts) > 1 else ''
         return command, args
     except Exception as e:
@@ -86,7 +94,7 @@ def parse_reward_command(args: str) -> Tuple[str, Decimal]:
     """
     parts = args.split()
     if len(parts) != 2:
-        raise ValidationError(COMMAND_MESSAGES["reward_parse_error"].template)
+        raise ValidationError(COMMAND_MESSAGES["reward_parse_error"])
     
     instance_id, amount_str = parts
     amount = validate_reward_amount(amount_str)
@@ -106,8 +114,8 @@ async def submit_reward_to_market(
         RewardSubmissionError: If submission fails
     """
     try:
-        async with AgentMarketClient() as client:
-            await client.report_reward(instance_id, float(amount))
+        client = get_client()
+        await client.report_reward(instance_id, float(amount))
     except AgentMarketAPIError as e:
         raise RewardSubmissionError(f"Failed to submit reward: {str(e)}")
 
@@ -118,10 +126,9 @@ async def command_help(chat_id: int, args: str = '') -> None:
         chat_id: Telegram chat ID
         args: Command arguments (unused)
     """
-    send_message(chat_id, HELP_MESSAGE)
+    await message_queue.enqueue(chat_id, HELP_MESSAGE)
 
-@error_handler(ValidationError)
-@error_handler(RewardSubmissionError)
+@error_handler((ValidationError, RewardSubmissionError))
 async def command_submit_reward(chat_id: int, args: str) -> None:
     """Handle /submit_reward command.
     
@@ -138,11 +145,11 @@ async def command_submit_reward(chat_id: int, args: str) -> None:
     instance_id, amount = parse_reward_command(args)
     await submit_reward_to_market(instance_id, amount)
     
-    success_msg = SUCCESS_MESSAGES["reward_submitted"].format(
+    success_msg = SUCCESS_FORMATTERS["reward_submitted"](
         float(amount),
         instance_id
     )
-    send_message(chat_id, success_msg)
+    await message_queue.enqueue(chat_id, success_msg)
 
 async def command_balance(chat_id: int, args: str = '') -> None:
     """Handle /balance command.
@@ -154,23 +161,16 @@ async def command_balance(chat_id: int, args: str = '') -> None:
         args: Command arguments (unused)
     """
     try:
-        async with AgentMarketClient() as client:
-            balance_info = await client.get_wallet_balance()
-            success_msg = SUCCESS_MESSAGES["wallet_balance"].format(
-                balance=balance_info.get('balance', 0),
-                status=balance_info.get('status', 'Active')
-            )
-            send_message(chat_id, success_msg)
+        client = get_client()
+        balance_info = await client.get_wallet_balance()
+        success_msg = SUCCESS_FORMATTERS["wallet_balance"](
+            balance=balance_info.get('balance', 0),
+            status=balance_info.get('status', 'Active')
+        )
+        await message_queue.enqueue(chat_id, success_msg)
     except AgentMarketAPIError as e:
-        error_msg = f"{Emoji.ERROR} Failed to retrieve wallet balance: {str(e)}"
-        send_message(chat_id, error_msg)
-
-# Command router mapping
-COMMAND_HANDLERS = {
-    '/help': command_help,
-    '/submit_reward': command_submit_reward,
-    '/balance': command_balance
-}
+        error_msg = f"{EMOJI_ERROR} Failed to retrieve wallet balance: {str(e)}"
+        await message_queue.enqueue(chat_id, error_msg)
 
 @error_handler(CommandParseError)
 async def handle_command(message: Dict[str, Any]) -> None:
@@ -188,11 +188,15 @@ async def handle_command(message: Dict[str, Any]) -> None:
     chat_id = message['chat']['id']
     command, args = extract_command_parts(message['text'])
     
-    handler = COMMAND_HANDLERS.get(command)
-    if handler:
-        await handler(chat_id, args)
-    else:
-        send_message(
-            chat_id,
-            ERROR_MESSAGES["invalid_command"].template.format(command=command)
-        )
+    match command:
+        case '/help':
+            await command_help(chat_id, args)
+        case '/submit_reward':
+            await command_submit_reward(chat_id, args)
+        case '/balance':
+            await command_balance(chat_id, args)
+        case _:
+            await message_queue.enqueue(
+                chat_id,
+                ERROR_FORMATTERS["invalid_command"](command)
+            )
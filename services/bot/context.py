@@ -1,10 +1,11 @@
 """Message context tracking and management."""
 
+import time
 from typing import Optional, Dict, Any
 from dataclasses import dataclass, field
 from datetime import datetime
 
-@dataclass
+@dataclass(slots=True)
 class MessageContext:
     """Tracks context for message processing."""
     
@@ -14,9 +15,14 @@ class MessageContext:
     instance_id: Optional[str] = None
     provider_id: Optional[str] = None
     command: Optional[str] = None
-    timestamp: datetime = field(default_factory=datetime.utcnow)
+    created_at: float = field(default_factory=time.time)
     metadata: Dict[str, Any] = field(default_factory=dict)
 
+    @property
+    def timestamp(self) -> datetime:
+        """UTC time the context was created, built from created_at on access."""
+        return datetime.utcfromtimestamp(self.created_at)
+
     def add_metadata(self, key: str, value: Any) -> None:
         """Add metadata to context.
         
@@ -1,11 +1,56 @@
 import re
-from typing import Optional, Tuple
+import time
+from typing import Any, Dict, Optional, Tuple
 from loguru import logger
-from services.client import AgentMarketClient
+from services.client import AgentMarketClient, get_client
 from services.request_tracker import RequestTracker
-from utils.telegram_utils import send_message
+from services.bot.message_queue import message_queue
 
-GITHUB_ISSUE_PATTERN = r'(?:https?://)?github\.com/([^/]+)/([^/]+)/issues/(\d+)'
+_GITHUB_ISSUE_RE = re.compile(r'(?:https?://)?github\.com/([^/]+)/([^/]+)/issues/(\d+)', re.ASCII)
+
+# Seconds a repository's issues, indexed by number, are reused before refetching
+ISSUE_CACHE_TTL = 300
+
+# Issue URLs remembered as registered; warm Lambda processes keep them across invocations
+MAX_CACHED_ISSUES = 1000
+
+# Repositories whose issue index is cached; warm Lambda processes keep it across invocations
+MAX_CACHED_REPOS = 1000
+
+# repo_url -> (expiry on the monotonic clock, issues by number)
+_issues_by_repo: Dict[str, Tuple[float, Dict[int, Dict[str, Any]]]] = {}
+
+# Issue URLs already registered with Agent Market by this process, oldest first.
+# add_repository is called with the issue URL, so each issue is registered once.
+_added_issues: Dict[str, None] = {}
+
+async def _find_issue(
+    client: AgentMarketClient, repo_url: str, issue_url: str, issue_number: int
+) -> Optional[Dict[str, Any]]:
+    """Look up an issue by number, reusing the repository's recently fetched issues.
+
+    The index is cached per repository, so links to other issues in the same
+    repository reuse it. It is only trusted for issues that already have an
+    instance; anything else is refetched in case its instance has been created since.
+    """
+    now = time.monotonic()
+    cached = _issues_by_repo.get(repo_url)
+    if cached is not None and cached[0] > now:
+        issue = cached[1].get(issue_number)
+        if issue and issue.get('instance_id'):
+            return issue
+    issues = await client.get_repository_issues(repo_url=issue_url) or []
+    by_number = {issue['issue_number']: issue for issue in issues}
+    # Re-insert so the cache stays ordered oldest first
+    _issues_by_repo.pop(repo_url, None)
+    _issues_by_repo[repo_url] = (now + ISSUE_CACHE_TTL, by_number)
+    if len(_issues_by_repo) > MAX_CACHED_REPOS:
+        # Drop expired entries first, then the oldest ones if that is not enough
+        for key in [key for key, (expiry, _) in _issues_by_repo.items() if expiry <= now]:
+            del _issues_by_repo[key]
+        while len(_issues_by_repo) > MAX_CACHED_REPOS:
+            del _issues_by_repo[next(iter(_issues_by_repo))]
+    return by_number.get(issue_number)
 
 def parse_github_issue(text: str) -> Optional[Tuple[str, str, str]]:
     """Extract owner, repo and issue number from GitHub issue URL.
@@ -13,7 +58,10 @@ def parse_github_issue(text: str) -> Optional[Tuple[str, str, str]]:
     Returns:
         Tuple of (owner, repo, issue_number) or None if no match
     """
-    match = re.search(GITHUB_ISSUE_PATTERN, text)
+    # Most messages carry no GitHub link; skip the regex scan for them
+    if 'github.com' not in text:
+        return None
+    match = _GITHUB_ISSUE_RE.search(text)
     return match.groups() if match else None
 
 async def handle_github_issue(chat_id: int, owner: str, repo: str, issue_num: str) -> None:
@@ -29,37 +77,40 @@ async def handle_github_issue(chat_id: int, owner: str, repo: str, issue_num: st
     issue_number = int(issue_num)
     issue_url = f"{repo_url}/issues/{issue_number}"
     
-    async with AgentMarketClient() as client:
-        try:
-            # Add repository
+    client = get_client()
+    try:
+        # Register the issue's repository, once per issue URL
+        if issue_url not in _added_issues:
             repo_data = {
                 "repo_url": issue_url,
                 "default_reward": 0.04,
             }
             await client.add_repository(repo_data)
+            _added_issues[issue_url] = None
+            if len(_added_issues) > MAX_CACHED_ISSUES:
+                del _added_issues[next(iter(_added_issues))]
 
-            # Get issue details and instance
-            issues = await client.get_repository_issues(repo_url=issue_url)
-            issue = next((i for i in issues if i['issue_number'] == issue_number), None)
+        # Get issue details and instance
+        issue = await _find_issue(client, repo_url, issue_url, issue_number)
 
-            if not issue or not issue.get('instance_id'):
-                send_message(chat_id, f"❌ Instance for issue #{issue_number} not found.")
-                return
+        if not issue or not issue.get('instance_id'):
+            await message_queue.enqueue(chat_id, f"❌ Instance for issue #{issue_number} not found.")
+            return
 
-            # Store instance tracking
-            instance_id = issue['instance_id']
-            tracker = RequestTracker()
-            await tracker.add_request(instance_id, chat_id)
+        # Store instance tracking
+        instance_id = issue['instance_id']
+        tracker = RequestTracker.instance()
+        await tracker.add_request(instance_id, chat_id)
 
-            send_message(
-                chat_id,
-                f"✅ Created instance `{instance_id}` from GitHub issue #{issue_number}:\n"
-                f"*{issue['title']}*\n\n"
-            )
+        await message_queue.enqueue(
+            chat_id,
+            f"✅ Created instance `{instance_id}` from GitHub issue #{issue_number}:\n"
+            f"*{issue['title']}*\n\n"
+        )
             
-        except Exception as e:
-            logger.error(f"Error handling GitHub issue: {e}")
-            send_message(
-                chat_id,
-                f"❌ Failed to process GitHub issue: {str(e)}. Please try again later."
-            )
+    except Exception as e:
+        logger.error(f"Error handling GitHub issue: {e}")
+        await message_queue.enqueue(
+            chat_id,
+            f"❌ Failed to process GitHub issue: {str(e)}. Please try again later."
+        )
@@ -1,15 +1,18 @@
 """Handler for code requests."""
 
+import re
 from typing import Dict, Any
 from loguru import logger
 from ..base_handler import BaseHandler
 from ..context import MessageContext
 from ..message_types import TextMessage
-from services.client import AgentMarketClient
+from services.client import get_client
 from services.request_tracker import RequestTracker
-from utils.telegram_utils import send_message
+from ..message_queue import message_queue
 from utils.errors import TelegramError, error_handler
-from ..messages import ERROR_MESSAGES, SUCCESS_MESSAGES
+from ..messages import ERROR_MESSAGES, SUCCESS_FORMATTERS
+
+_BOT_MENTION_RE = re.compile(r'@group_write_bot', re.IGNORECASE)
 
 class CodeRequestHandler(BaseHandler):
     """Handles processing of code request messages."""
@@ -23,10 +26,12 @@ class CodeRequestHandler(BaseHandler):
             context: Message context information
         """
         chat_id = message.chat.id
-        command_text = message.text.lower().split('@group_write_bot', 1)[1].strip()
+        text = message.text
+        mention = _BOT_MENTION_RE.search(text)
+        command_text = text[mention.end():].strip() if mention else ''
         
         if not command_text:
-            send_message(chat_id, ERROR_MESSAGES["missing_code_request"])
+            await message_queue.enqueue(chat_id, ERROR_MESSAGES["missing_code_request"])
             return
 
         instance_data = {
@@ -37,11 +42,11 @@ class CodeRequestHandler(BaseHandler):
             "percentage_reward": 1,
         }
         
-        async with AgentMarketClient() as client:
-            response = await client.create_instance(instance_data)
+        client = get_client()
+        response = await client.create_instance(instance_data)
         instance_id = response['id']
                 
-        tracker = RequestTracker()
+        tracker = RequestTracker.instance()
+        # Only report success once the instance is tracked, or provider replies would never be relayed
         await tracker.add_request(instance_id, chat_id)
-            
-        send_message(chat_id, SUCCESS_MESSAGES["instance_created"].format(instance_id))
+        await message_queue.enqueue(chat_id, SUCCESS_FORMATTERS["instance_created"](instance_id))
@@ -20,22 +20,24 @@ class ReactionHandler(BaseHandler):
         """
         emoji = message_reaction['new_reaction'][0]['emoji']
         message_id = message_reaction['message_id']
-        chat_id = message_reaction['chat']['id']
+        chat = message_reaction['chat']
+        chat_id = chat['id']
         user = message_reaction['user']
+        user_get = user.get
         
-        logger.info(f"Reaction received: {emoji} from user {user.get('username')} in chat {chat_id}")
+        logger.info("Reaction received: {} from user {} in chat {}", emoji, user_get('username'), chat_id)
         
         return {
             'message_id': message_id,
             'from': {
                 'id': user['id'],
-                'is_bot': user.get('is_bot', False),
-                'first_name': user.get('first_name', ''),
-                'username': user.get('username', '')
+                'is_bot': user_get('is_bot', False),
+                'first_name': user_get('first_name', ''),
+                'username': user_get('username', '')
             },
             'chat': {
                 'id': chat_id,
-                'type': message_reaction['chat'].get('type', 'unknown')
+                'type': chat.get('type', 'unknown')
             },
             'date': message_reaction['date'],
             'text': f"Reaction {emoji} to message {message_id}",
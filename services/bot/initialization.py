@@ -1,35 +1,42 @@
 import os
-import requests
 from typing import List, Dict
+import orjson
 from loguru import logger
 
-def set_bot_commands(chat_id: int) -> None:
+from services.client_session import get_session
+
+COMMANDS = [
+    {
+        "command": "help",
+        "description": "Show help message"
+    },
+    {
+        "command": "submit_reward",
+        "description": "Submit reward for an instance"
+    }
+]
+# Request bodies are serialized once; per-chat bodies only append the chat ID
+_COMMANDS_JSON = orjson.dumps({"commands": COMMANDS})
+_CHAT_COMMANDS_PREFIX = _COMMANDS_JSON[:-1] + b',"chat_id":'
+_JSON_HEADERS = {'Content-Type': 'application/json'}
+
+async def set_bot_commands(chat_id: int) -> None:
     """Set up the bot's commands for a group chat.
     
     Args:
         chat_id: Telegram chat ID to set commands for
     """
-    commands = [
-        {
-            "command": "help",
-            "description": "Show help message"
-        },
-        {
-            "command": "submit_reward",
-            "description": "Submit reward for an instance"
-        }
-    ]
-    
     token = os.environ['GROUPWRITE_TELEGRAM_BOT_TOKEN']
     commands_url = f"https://api.telegram.org/bot{token}/setMyCommands"
     
     try:
-        response = requests.post(commands_url, json={
-            "commands": commands,
-            "chat_id": chat_id
-        })
-        response.raise_for_status()
-        logger.info(f"Successfully set commands for chat {chat_id}")
+        async with get_session().post(
+            commands_url,
+            data=b"%s%d}" % (_CHAT_COMMANDS_PREFIX, chat_id),
+            headers=_JSON_HEADERS
+        ) as response:
+            response.raise_for_status()
+        logger.info("Successfully set commands for chat {}", chat_id)
     except Exception as e:
         logger.error(f"Error setting commands: {str(e)}")
 
@@ -44,20 +51,10 @@ async def initialize_bot() -> None:
         
     # Set global bot commands
     commands_url = f"https://api.telegram.org/bot{token}/setMyCommands"
-    commands = [
-        {
-            "command": "help",
-            "description": "Show help message"
-        },
-        {
-            "command": "submit_reward", 
-            "description": "Submit reward for an instance"
-        }
-    ]
     
     try:
-        response = requests.post(commands_url, json={"commands": commands})
-        response.raise_for_status()
+        async with get_session().post(commands_url, data=_COMMANDS_JSON, headers=_JSON_HEADERS) as response:
+            response.raise_for_status()
         logger.info("Successfully set global bot commands")
     except Exception as e:
         logger.error(f"Failed to set bot commands: {e}")
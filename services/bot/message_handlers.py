@@ -6,38 +6,49 @@ import re
 from loguru import logger
 
 from .messages import (
-    WELCOME_MESSAGE,
-    ERROR_MESSAGES,
+    WELCOME_MESSAGE_MD2,
+    ERROR_MESSAGES_MD2,
+    ERROR_FORMATTERS,
     SUCCESS_MESSAGES,
+    SUCCESS_FORMATTERS,
     PROVIDER_MESSAGES,
     GITHUB_MESSAGES,
     COMMAND_USAGE,
-    MessageCategory,
-    Emoji
+    MessageCategory
 )
 
-from services.client import AgentMarketClient
+from services.client import get_client
 from services.request_tracker import RequestTracker
-from utils.telegram_utils import send_message
+from .message_queue import message_queue
 from utils.errors import (
     TelegramError, 
-    ValidationError,
     error_handler,
     error_context
 )
 from .base_handler import BaseHandler
 from .message_types import BaseMessage, TextMessage, NewChatMemberMessage
 from .context import MessageContext
-from .github import handle_github_issue_link
+from .github import parse_github_issue, handle_github_issue
 from .provider import parse_provider_mention, send_message_to_provider
 from .initialization import set_bot_commands
+from .command_handlers import handle_command
 
-BOT_MENTION_PATTERN = r'@group_code_bot\s+(.*)'
+_BOT_MENTION_RE = re.compile(r'@group_code_bot\s+(.*)')
+_CODE_REQUEST_RE = re.compile(r'@group_write_bot', re.IGNORECASE)
+# Classifies a text message in one pass, in routing priority order:
+# 1 command, 2 provider mention, 3 GitHub link, 4 code request
+_ROUTE_RE = re.compile(r'(/)|(@)|.*?(github\.com)|.*?(@group_write_bot)', re.IGNORECASE | re.DOTALL)
 
 class MessageHandler(BaseHandler):
     """Handles processing of different message types."""
 
-    @error_handler(TelegramError)
+    def __init__(self):
+        # Handlers keyed by exact message type
+        self._dispatch = {
+            NewChatMemberMessage: self._handle_new_chat_member,
+            TextMessage: self.handle_text_message
+        }
+
     def get_reaction_message(self, message_reaction: Dict[str, Any]) -> Dict[str, Any]:
         """Format a reaction update into a storable message format.
         
@@ -52,7 +63,7 @@ class MessageHandler(BaseHandler):
         chat_id = message_reaction['chat']['id']
         user = message_reaction['user']
         
-        logger.info(f"Reaction received: {emoji} from user {user.get('username')} in chat {chat_id}")
+        logger.info("Reaction received: {} from user {} in chat {}", emoji, user.get('username'), chat_id)
         
         return {
         'message_id': message_id,
@@ -74,7 +85,6 @@ class MessageHandler(BaseHandler):
         }
     }
 
-    @error_handler(ValidationError)
     def parse_bot_mention(self, text: str) -> Optional[str]:
         """Extract command text from bot mention.
         
@@ -84,10 +94,9 @@ class MessageHandler(BaseHandler):
         Returns:
             Extracted command text or None if no valid mention
         """
-        match = re.search(BOT_MENTION_PATTERN, text)
+        match = _BOT_MENTION_RE.search(text)
         return match.group(1) if match else None
 
-    @error_handler(TelegramError)
     async def handle_code_request(self, message: TextMessage, context: MessageContext) -> None:
         """Handle code request commands.
         
@@ -99,46 +108,48 @@ class MessageHandler(BaseHandler):
             ValidationError: If request text is invalid
             TelegramError: If request creation fails
         """
-        with error_context(ValidationError, "Invalid code request"):
-            chat_id = message.chat.id
-            command_text = message.text.lower().split('@group_write_bot', 1)[1].strip()
-            
-            if not command_text:
-                send_message(
-                    chat_id,
-                    ERROR_MESSAGES["missing_code_request"],
-                    parse_mode="MarkdownV2"
-                )
-                return
+        chat_id = message.chat.id
+        text = message.text
+        mention = _CODE_REQUEST_RE.search(text)
+        command_text = text[mention.end():].strip() if mention else ''
+        
+        if not command_text:
+            await message_queue.enqueue(
+                chat_id,
+                ERROR_MESSAGES_MD2["missing_code_request"],
+                parse_mode="MarkdownV2",
+                escaped=True
+            )
+            return
 
-            instance_data = {
-                "background": command_text,
-                "max_credit_per_instance": 0.04,
-                "instance_timeout": 30,
-                "gen_reward_timeout": 6000,
-                "percentage_reward": 1,
-            }
-            
-            try:
-                async with AgentMarketClient() as client:
-                    response = await client.create_instance(instance_data)
-                instance_id = response['id']
-                    
-                tracker = RequestTracker()
-                await tracker.add_request(instance_id, chat_id)
+        instance_data = {
+            "background": command_text,
+            "max_credit_per_instance": 0.04,
+            "instance_timeout": 30,
+            "gen_reward_timeout": 6000,
+            "percentage_reward": 1,
+        }
+        
+        try:
+            client = get_client()
+            response = await client.create_instance(instance_data)
+            instance_id = response['id']
                 
-                send_message(
-                    chat_id,
-                    f"{Emoji.SUCCESS} {SUCCESS_MESSAGES['instance_created'].format(instance_id)}",
-                    parse_mode="MarkdownV2"
-                )
-            except Exception as e:
-                logger.error(f"Failed to create instance: {str(e)}")
-                send_message(
-                    chat_id,
-                    f"{Emoji.ERROR} {ERROR_MESSAGES['instance_creation_failed'].format(str(e))}",
-                    parse_mode="MarkdownV2"
-                )
+            tracker = RequestTracker.instance()
+            await tracker.add_request(instance_id, chat_id)
+            
+            await message_queue.enqueue(
+                chat_id,
+                SUCCESS_FORMATTERS['instance_created'](instance_id),
+                parse_mode="MarkdownV2"
+            )
+        except Exception as e:
+            logger.error(f"Failed to create instance: {str(e)}")
+            await message_queue.enqueue(
+                chat_id,
+                ERROR_FORMATTERS['instance_creation_failed'](e),
+                parse_mode="MarkdownV2"
+            )
 
     @error_handler(TelegramError)
     async def handle_text_message(self, message: TextMessage, context: MessageContext) -> None:
@@ -152,57 +163,66 @@ class MessageHandler(BaseHandler):
             ValidationError: If message format is invalid
             TelegramError: If message handling fails
         """
-        from .command_handlers import handle_command
-        
-        with error_context(ValidationError, "Invalid message format"):
-            chat_id = message.chat.id
-            text = message.text.strip()
+        chat_id = message.chat.id
+        text = message.text
 
-            if not text:
-                send_message(
-                    chat_id,
-                    f"{Emoji.ERROR} {ERROR_MESSAGES['empty_message']}",
-                    parse_mode="MarkdownV2"
+        if not text or text.isspace():
+            await message_queue.enqueue(
+                chat_id,
+                ERROR_MESSAGES_MD2['empty_message'],
+                parse_mode="MarkdownV2",
+                escaped=True
+            )
+            return
+
+        # Only strip when there is surrounding whitespace to remove
+        if text[0].isspace() or text[-1].isspace():
+            text = text.strip()
+
+        route = _ROUTE_RE.match(text)
+        kind = route.lastindex if route else None
+
+        # Check for commands
+        if kind == 1:
+            # Command handlers work on the raw Telegram message
+            await handle_command(message.model_dump(by_alias=True))
+            return
+
+        # Check for provider mentions
+        if kind == 2:
+            provider_mention = parse_provider_mention(text)
+            if provider_mention:
+                provider_id, message_content, instance_id = provider_mention
+                await send_message_to_provider(
+                    chat_id, 
+                    provider_id, 
+                    message_content, 
+                    instance_id=instance_id
                 )
                 return
-
-            # Check for commands
-            if text.startswith('/'):
-                await handle_command(message)
+            else:
+                await message_queue.enqueue(
+                    chat_id,
+                    ERROR_MESSAGES_MD2['invalid_provider_format'],
+                    parse_mode="MarkdownV2",
+                    escaped=True
+                )
                 return
 
-            # Check for provider mentions
-            if text.startswith('@'):
-                provider_mention = parse_provider_mention(text)
-                if provider_mention:
-                    provider_id, message_content, instance_id = provider_mention
-                    await send_message_to_provider(
-                        chat_id, 
-                        provider_id, 
-                        message_content, 
-                        instance_id=instance_id
-                    )
-                    return
-                else:
-                    send_message(
-                        chat_id,
-                        f"{Emoji.ERROR} {ERROR_MESSAGES['invalid_provider_format']}",
-                        parse_mode="MarkdownV2"
-                    )
-                    return
-
-            # Check for GitHub issue links
-            if 'github.com' in text.lower():
-                await handle_github_issue_link(message)
-                return
+        # Check for GitHub issue links
+        if kind == 3:
+            issue = parse_github_issue(text)
+            if issue:
+                await handle_github_issue(chat_id, *issue)
+            return
 
-            # Check for bot mentions
-            if '@group_write_bot' in text.lower():
-                await self.handle_code_request(message, context)
-                return
+        # Check for bot mentions
+        if kind == 4:
+            await self.handle_code_request(message, context)
+            return
 
-            # Unhandled message type
-            logger.warning(f"Unhandled message type: {text[:50]}...")
+        # Unhandled message type
+        logger.warning(f"Unhandled message type: {text[:50]}...")
 
     async def handle(self, message: BaseMessage, context: MessageContext) -> None:
         """Handle incoming messages based on their type.
@@ -216,10 +236,9 @@ class MessageHandler(BaseHandler):
             ValidationError: If message validation fails
         """
         with error_context(TelegramError, "Failed to handle message"):
-            if isinstance(message, NewChatMemberMessage):
-                await self._handle_new_chat_member(message, context)
-            elif isinstance(message, TextMessage):
-                await self.handle_text_message(message, context)
+            handler = self._dispatch.get(type(message))
+            if handler:
+                await handler(message, context)
             else:
                 logger.warning(f"Unsupported message type: {type(message)}")
 
@@ -234,22 +253,14 @@ class MessageHandler(BaseHandler):
         Raises:
             TelegramError: If welcome message fails to send
         """
-        with error_context(TelegramError, "Failed to handle new chat member"):
-            if 'new_chat_members' in message:
-                from .initialization import set_bot_commands
-                
-                for member in message['new_chat_members']:
-                    if member.get('username') == "group_code_bot":
-                        chat_id = message.chat.id
-                        set_bot_commands(chat_id)
-                        send_message(
-                            chat_id,
-                            f"{Emoji.WAVE} {WELCOME_MESSAGE}",
-                            parse_mode="MarkdownV2"
-                        )
-                        logger.info(f"Bot added to chat {chat_id}")
-                return
-            
-            # Handle text messages
-            if 'text' in message:
-                await self.handle_text_message(message, context)
+        for member in message.new_chat_members:
+            if member.username == "group_code_bot":
+                chat_id = message.chat.id
+                await set_bot_commands(chat_id)
+                await message_queue.enqueue(
+                    chat_id,
+                    WELCOME_MESSAGE_MD2,
+                    parse_mode="MarkdownV2",
+                    escaped=True
+                )
+                logger.info("Bot added to chat {}", chat_id)
@@ -1,19 +1,38 @@
 """Message processing and routing logic."""
 
-from typing import Dict, Type, Optional
+import re
+from typing import Dict, List, Type, Optional
 from loguru import logger
 
 from .base_handler import BaseHandler
 from .message_types import BaseMessage, CommandMessage, CodeRequest, ProviderMessage, GitHubIssue
 from .context import MessageContext
+from .message_queue import message_queue
 from utils.errors import ValidationError, TelegramError, handle_error
 from utils.errors import error_context
 
+# Message types in classification priority order, indexed by the matching group;
+# index 0 is the fallback for messages that match nothing
+_ROUTE_RE = re.compile(r'(/)|.*?(@group_write_bot)|.*?(github\.com)|(@)', re.IGNORECASE | re.DOTALL)
+_ROUTE_TYPES = (BaseMessage, CommandMessage, CodeRequest, GitHubIssue, ProviderMessage)
+
+def _route_index(message: Dict) -> int:
+    """Return the position in _ROUTE_TYPES of the message's type"""
+    if 'text' in message:
+        route = _ROUTE_RE.match(message['text'])
+        if route:
+            return route.lastindex
+    return 0
+
 class MessageProcessor:
     """Routes and processes messages to appropriate handlers."""
+
+    __slots__ = ('handlers', '_route_table')
     
     def __init__(self):
         self.handlers: Dict[Type[BaseMessage], BaseHandler] = {}
+        # Handlers laid out parallel to _ROUTE_TYPES so routing is one index
+        self._route_table: List[Optional[BaseHandler]] = [None] * len(_ROUTE_TYPES)
 
     def register_handler(self, message_type: Type[BaseMessage], handler: BaseHandler) -> None:
         """Register a handler for a message type.
@@ -23,6 +42,8 @@ class MessageProcessor:
             handler: Handler instance
         """
         self.handlers[message_type] = handler
+        if message_type in _ROUTE_TYPES:
+            self._route_table[_ROUTE_TYPES.index(message_type)] = handler
 
     def get_message_type(self, message: Dict) -> Optional[Type[BaseMessage]]:
         """Determine message type from raw message.
@@ -33,17 +54,7 @@ class MessageProcessor:
         Returns:
             Message type class or None if unknown
         """
-        if 'text' in message:
-            text = message['text']
-            if text.startswith('/'):
-                return CommandMessage
-            elif '@group_write_bot' in text.lower():
-                return CodeRequest
-            elif 'github.com' in text.lower():
-                return GitHubIssue
-            elif text.startswith('@'):
-                return ProviderMessage
-        return BaseMessage
+        return _ROUTE_TYPES[_route_index(message)]
 
     async def process_message(self, message: Dict) -> None:
         """Process and route a message to appropriate handler.
@@ -56,16 +67,11 @@ class MessageProcessor:
             TelegramError: If handler processing fails
         """
         with error_context(ValidationError, "Message processing failed"):
-            # Determine message type
-            message_type = self.get_message_type(message)
-            if not message_type:
-                logger.warning(f"Unknown message type: {message}")
-                return
-
-            # Get appropriate handler
-            handler = self.handlers.get(message_type)
+            # Classify the message and pick its handler in one step
+            index = _route_index(message)
+            handler = self._route_table[index]
             if not handler:
-                logger.warning(f"No handler for message type: {message_type}")
+                logger.warning(f"No handler for message type: {_ROUTE_TYPES[index]}")
                 return
 
             # Validate message
@@ -79,3 +85,6 @@ class MessageProcessor:
                 await handler.handle(validated_message, context)
             except Exception as e:
                 handle_error(TelegramError, f"Handler failed: {str(e)}")
+            finally:
+                # Deliver the handler's replies before the invocation ends
+                await message_queue.flush()
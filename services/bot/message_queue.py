@@ -0,0 +1,191 @@
+"""Outgoing Telegram message queue.
+
+Messages enqueued for the same chat within a short window are coalesced into
+as few sendMessage calls as possible. Sends are paced to stay under
+Telegram's limits of 30 messages per second bot-wide and 20 per minute in a
+group. Identical messages queued back to back for a chat are sent once, and
+a 429 response is retried with backoff, honouring Telegram's retry_after.
+Messages queued with coalesce=False, such as provider notifications that
+users reply to, are always sent on their own.
+"""
+
+import asyncio
+import time
+from typing import Dict, List, Optional, Tuple
+from loguru import logger
+
+from utils.telegram_utils import send_message, escape_markdown
+
+# Telegram rejects messages longer than this many characters
+MAX_MESSAGE_LENGTH = 4096
+
+# Seconds to collect messages for a chat before sending them
+FLUSH_INTERVAL = 0.1
+
+# Separator placed between coalesced messages
+MESSAGE_SEPARATOR = "\n\n"
+
+# Telegram's documented send limits
+GLOBAL_RATE_PER_SECOND = 30
+CHAT_RATE_PER_MINUTE = 20
+
+# Attempts per message before a rate-limited send is dropped
+MAX_SEND_ATTEMPTS = 3
+
+# Per-chat buckets kept before idle ones are dropped
+MAX_CHAT_BUCKETS = 1000
+
+
+class TokenBucket:
+    """Allow at most `rate` acquisitions per `per` seconds, with bursts up to `rate`"""
+
+    def __init__(self, rate: float, per: float):
+        self.capacity = rate
+        self.tokens = rate
+        self.fill_rate = rate / per
+        self.updated = time.monotonic()
+
+    async def acquire(self) -> None:
+        """Wait until a token is available and take it"""
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.fill_rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.fill_rate)
+
+    def is_full(self) -> bool:
+        """Whether the bucket has refilled, so a new bucket would behave the same"""
+        return self.tokens + (time.monotonic() - self.updated) * self.fill_rate >= self.capacity
+
+
+def _coalesce(items: List[Tuple[str, Optional[str], bool]]) -> List[Tuple[str, Optional[str]]]:
+    """Join consecutive messages that share a parse mode, keeping each under the size limit.
+
+    Messages queued with coalesce=False are neither merged into others nor
+    have others merged into them.
+    """
+    batches: List[Tuple[str, Optional[str]]] = []
+    # Whether the last batch may take more messages
+    last_open = False
+    previous = None
+    for item in items:
+        # Drop repeats of the message queued just before, e.g. a burst of identical notifications
+        if item == previous:
+            continue
+        previous = item
+        text, parse_mode, coalesce = item
+        if coalesce and last_open:
+            last_text, last_mode = batches[-1]
+            if last_mode == parse_mode:
+                combined = f"{last_text}{MESSAGE_SEPARATOR}{text}"
+                if len(combined) <= MAX_MESSAGE_LENGTH:
+                    batches[-1] = (combined, parse_mode)
+                    continue
+        batches.append((text, parse_mode))
+        last_open = coalesce
+    return batches
+
+
+class MessageQueue:
+    """Per-chat outgoing message buffer flushed on a short timer"""
+
+    def __init__(self, flush_interval: float = FLUSH_INTERVAL):
+        self.flush_interval = flush_interval
+        self._bucket = TokenBucket(GLOBAL_RATE_PER_SECOND, 1)
+        self._chat_buckets: Dict[int, TokenBucket] = {}
+        self._pending: Dict[int, List[Tuple[str, Optional[str], bool]]] = {}
+        self._timers: Dict[int, asyncio.TimerHandle] = {}
+        # Latest send task per chat; each send waits for the previous one to keep order
+        self._sends: Dict[int, asyncio.Task] = {}
+
+    async def enqueue(
+        self,
+        chat_id: int,
+        text: str,
+        parse_mode: Optional[str] = None,
+        escaped: bool = False,
+        coalesce: bool = True
+    ) -> None:
+        """Queue a message for the chat; it is sent when the chat's window closes.
+
+        MarkdownV2 text is escaped here unless `escaped` says the caller has
+        already escaped it and wants its own formatting kept. Pass
+        coalesce=False for messages that must reach the chat as a message of
+        their own, e.g. ones users reply to.
+        """
+        if parse_mode == 'MarkdownV2' and not escaped:
+            text = escape_markdown(text)
+        self._pending.setdefault(chat_id, []).append((text, parse_mode, coalesce))
+        if chat_id not in self._timers:
+            self._timers[chat_id] = asyncio.get_running_loop().call_later(
+                self.flush_interval, self._start_send, chat_id
+            )
+
+    def _start_send(self, chat_id: int) -> None:
+        self._timers.pop(chat_id, None)
+        items = self._pending.pop(chat_id, [])
+        task = asyncio.get_running_loop().create_task(
+            self._send(chat_id, items, self._sends.get(chat_id))
+        )
+        self._sends[chat_id] = task
+        task.add_done_callback(lambda t: self._forget_send(chat_id, t))
+
+    def _forget_send(self, chat_id: int, task: asyncio.Task) -> None:
+        if self._sends.get(chat_id) is task:
+            del self._sends[chat_id]
+
+    async def _send(
+        self,
+        chat_id: int,
+        items: List[Tuple[str, Optional[str], bool]],
+        previous: Optional[asyncio.Task]
+    ) -> None:
+        if previous is not None:
+            await asyncio.gather(previous, return_exceptions=True)
+        for text, parse_mode in _coalesce(items):
+            await self._send_one(chat_id, text, parse_mode)
+
+    async def _send_one(self, chat_id: int, text: str, parse_mode: Optional[str]) -> None:
+        # Only group chats (negative IDs) are limited per chat
+        if chat_id < 0:
+            bucket = self._chat_buckets.get(chat_id)
+            if bucket is None:
+                if len(self._chat_buckets) >= MAX_CHAT_BUCKETS:
+                    self._drop_idle_buckets()
+                bucket = self._chat_buckets[chat_id] = TokenBucket(CHAT_RATE_PER_MINUTE, 60)
+            await bucket.acquire()
+        for attempt in range(MAX_SEND_ATTEMPTS):
+            await self._bucket.acquire()
+            try:
+                result = await send_message(chat_id, text, parse_mode=parse_mode, escape=False)
+            except Exception as e:
+                logger.error(f"Failed to send message to chat {chat_id}: {e}")
+                return
+            if result.get('ok', True):
+                return
+            if result.get('error_code') != 429 or attempt == MAX_SEND_ATTEMPTS - 1:
+                logger.error(f"Telegram rejected message to chat {chat_id}: {result.get('error')}")
+                return
+            # Back off exponentially, but never retry sooner than Telegram asked
+            retry_after = max(result.get('parameters', {}).get('retry_after', 0), 2 ** attempt)
+            logger.warning(f"Rate limited sending to chat {chat_id}, retrying in {retry_after}s")
+            await asyncio.sleep(retry_after)
+
+    def _drop_idle_buckets(self) -> None:
+        """Forget per-chat buckets that have refilled; only chats that sent in the last minute remain"""
+        for chat_id in [chat_id for chat_id, bucket in self._chat_buckets.items() if bucket.is_full()]:
+            del self._chat_buckets[chat_id]
+
+    async def flush(self) -> None:
+        """Send everything still queued without waiting for the window to close"""
+        while self._timers or self._sends:
+            for chat_id, timer in list(self._timers.items()):
+                timer.cancel()
+                self._start_send(chat_id)
+            await asyncio.gather(*self._sends.values(), return_exceptions=True)
+
+
+message_queue = MessageQueue()
@@ -2,10 +2,14 @@
 
 from typing import Optional, List
 from datetime import datetime
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
+
+# Validated messages are read-only; unknown Telegram fields are dropped
+_MESSAGE_CONFIG = ConfigDict(frozen=True, extra='ignore', populate_by_name=True)
 
 class User(BaseModel):
     """Telegram user model."""
+    model_config = _MESSAGE_CONFIG
     id: int
     is_bot: bool = False
     first_name: str
@@ -15,6 +19,7 @@ class User(BaseModel):
 
 class Chat(BaseModel):
     """Telegram chat model."""
+    model_config = _MESSAGE_CONFIG
     id: int
     type: str
     title: Optional[str] = None
@@ -22,6 +27,7 @@ class Chat(BaseModel):
 
 class BaseMessage(BaseModel):
     """Base message model."""
+    model_config = _MESSAGE_CONFIG
     message_id: int
     from_user: Optional[User] = Field(None, alias='from')
     chat: Chat
@@ -29,9 +35,17 @@ class BaseMessage(BaseModel):
     text: Optional[str] = None
     reply_to_message: Optional['BaseMessage'] = None
 
+class TextMessage(BaseMessage):
+    """Text message model."""
+    text: str
+
+class NewChatMemberMessage(BaseMessage):
+    """Service message announcing members who joined the chat."""
+    new_chat_members: List[User]
+
 class CommandMessage(BaseMessage):
     """Command message model."""
-    command: str = Field(..., regex=r'^/[a-zA-Z0-9_]+$')
+    command: str = Field(..., pattern=r'^/[a-zA-Z0-9_]+$')
     args: str = ''
 
 class CodeRequest(BaseMessage):
@@ -51,4 +65,4 @@ class GitHubIssue(BaseMessage):
     issue_number: int
     url: str
 
-BaseMessage.update_forward_refs()
+BaseMessage.model_rebuild()
@@ -1,48 +1,41 @@
 """Message templates and constants used throughout the bot.
 
 This module centralizes all user-facing message strings used in the application.
-Messages are organized by categories and use consistent formatting with Pydantic validation.
+Messages are organized by categories and use consistent formatting; templates
+are checked at import when BOT_DEBUG_TEMPLATES is set.
 """
 
-from enum import Enum
-from typing import Dict, Optional, List, Union
-from pydantic import BaseModel, Field, field_validator, ValidationInfo
+import os
+import re
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Callable, Dict, Optional, List, Union
 
-class MessageCategory(Enum):
+from utils.telegram_utils import escape_markdown
+
+_PLACEHOLDER_RE = re.compile(r'\{([^}]+)\}')
+
+class MessageCategory(IntEnum):
     """Categories for different types of messages."""
-    WELCOME = "welcome"
-    HELP = "help" 
-    ERROR = "error"
-    SUCCESS = "success"
-    PROVIDER = "provider"
-    COMMAND = "command"
-    GITHUB = "github"
-
-class MessageTemplate(BaseModel):
-    """Base model for message templates with placeholder validation."""
+    WELCOME = 1
+    HELP = 2
+    ERROR = 3
+    SUCCESS = 4
+    PROVIDER = 5
+    COMMAND = 6
+    GITHUB = 7
+
+@dataclass(slots=True, frozen=True)
+class MessageTemplate:
+    """Message template with its category and declared placeholders."""
     template: str
     category: MessageCategory
-    placeholders: Optional[List[str]] = Field(default_factory=list)
-    
-    @field_validator('template')
-    def validate_placeholders(cls, v: str, info: ValidationInfo) -> str:
-        """Validate that declared placeholders exist in template."""
-        import re
-        # Get placeholders from model fields
-        placeholders = info.data.get('placeholders', [])
-        if not placeholders:  # No validation needed if no placeholders declared
-            return v
-            
-        # Only validate that declared placeholders exist in template
-        found = set(re.findall(r'\{([^}]+)\}', v))
-        missing = set(placeholders) - found
-        if missing:
-            raise ValueError(f"Template missing declared placeholders: {missing}")
-        return v
-
-class CommandUsage(BaseModel):
-    """Command usage template with validation."""
-    command: str = Field(..., pattern=r'^/')
+    placeholders: List[str] = field(default_factory=list)
+
+@dataclass(slots=True, frozen=True)
+class CommandUsage:
+    """Command usage template."""
+    command: str
     usage: str
     description: Optional[str]
 
@@ -65,8 +58,26 @@ class Emoji:
     LINK = "🔗"
     BROOM = "🧹"
 
+# Module-level aliases so per-call formatters read a global, not a class attribute
+EMOJI_SUCCESS = Emoji.SUCCESS
+EMOJI_ERROR = Emoji.ERROR
+EMOJI_INFO = Emoji.INFO
+EMOJI_WARNING = Emoji.WARNING
+EMOJI_MESSAGE = Emoji.MESSAGE
+EMOJI_CLOCK = Emoji.CLOCK
+EMOJI_ROCKET = Emoji.ROCKET
+EMOJI_WAVE = Emoji.WAVE
+EMOJI_WRENCH = Emoji.WRENCH
+EMOJI_MEMO = Emoji.MEMO
+EMOJI_CHAT = Emoji.CHAT
+EMOJI_SEARCH = Emoji.SEARCH
+EMOJI_GITHUB = Emoji.GITHUB
+EMOJI_CODE = Emoji.CODE
+EMOJI_LINK = Emoji.LINK
+EMOJI_BROOM = Emoji.BROOM
+
 # Command related message templates
-COMMAND_MESSAGES: Dict[str, MessageTemplate] = {
+_COMMAND_TEMPLATES: Dict[str, Union[MessageTemplate, str]] = {
     "parse_error": MessageTemplate(
         template=f"{Emoji.ERROR} Failed to parse command: {{error}}",
         category=MessageCategory.ERROR,
@@ -185,7 +196,7 @@ HELP_MESSAGE = f"""
 """
 
 # Error messages with validation
-ERROR_MESSAGES: Dict[str, MessageTemplate] = {
+_ERROR_TEMPLATES: Dict[str, Union[MessageTemplate, str]] = {
     # Command errors
     "invalid_command": MessageTemplate(
         template=f"{Emoji.ERROR} Unknown command: {{command}}",
@@ -202,6 +213,18 @@ ERROR_MESSAGES: Dict[str, MessageTemplate] = {
         category=MessageCategory.ERROR,
         placeholders=[]
     ),
+    "empty_message": MessageTemplate(
+        template=f"{Emoji.ERROR} Message cannot be empty",
+        category=MessageCategory.ERROR,
+        placeholders=[]
+    ),
+
+    # Instance errors
+    "instance_creation_failed": MessageTemplate(
+        template=f"{Emoji.ERROR} Failed to create instance: {{error}}",
+        category=MessageCategory.ERROR,
+        placeholders=["error"]
+    ),
     
     # Reward submission errors
     "invalid_reward_format": (
@@ -248,13 +271,13 @@ ERROR_MESSAGES: Dict[str, MessageTemplate] = {
 }
 
 # Success messages with validation
-SUCCESS_MESSAGES: Dict[str, MessageTemplate] = {
+_SUCCESS_TEMPLATES: Dict[str, Union[MessageTemplate, str]] = {
     # Wallet related
     "wallet_balance": MessageTemplate(
         template=(
             f"{Emoji.INFO} *Wallet Balance*\n"
-            "Balance: {{balance}} credits\n"
-            "Status: {{status}}"
+            "Balance: {balance} credits\n"
+            "Status: {status}"
         ),
         category=MessageCategory.SUCCESS,
         placeholders=["balance", "status"]
@@ -291,14 +314,14 @@ SUCCESS_MESSAGES: Dict[str, MessageTemplate] = {
 }
 
 # Provider message templates with validation
-PROVIDER_MESSAGES: Dict[str, MessageTemplate] = {
+_PROVIDER_TEMPLATES: Dict[str, Union[MessageTemplate, str]] = {
     "new_message": MessageTemplate(
         template=(
             f"{Emoji.MESSAGE} Message from provider:\n"
-            "({{provider_id}})\n"
-            "for instance: {{instance_id}}\n"
+            "({provider_id})\n"
+            "for instance: {instance_id}\n"
             f"{Emoji.CLOCK} {{timestamp}}\n\n"
-            "{{content}}"
+            "{content}"
         ),
         category=MessageCategory.PROVIDER,
         placeholders=["provider_id", "instance_id", "timestamp", "content"]
@@ -311,13 +334,13 @@ PROVIDER_MESSAGES: Dict[str, MessageTemplate] = {
 }
 
 # GitHub related messages with validation
-GITHUB_MESSAGES: Dict[str, MessageTemplate] = {
+_GITHUB_TEMPLATES: Dict[str, Union[MessageTemplate, str]] = {
     "issue_update": MessageTemplate(
         template=(
             f"{Emoji.GITHUB} GitHub Issue Update\n"
-            "Repository: {{repo}}\n"
-            "Issue #{{number}}: {{title}}\n"
-            "Status: {{status}}\n"
+            "Repository: {repo}\n"
+            "Issue #{number}: {title}\n"
+            "Status: {status}\n"
             f"{Emoji.LINK} {{url}}"
         ),
         category=MessageCategory.GITHUB,
@@ -325,8 +348,8 @@ GITHUB_MESSAGES: Dict[str, MessageTemplate] = {
     ),
     "pr_update": (
         f"{Emoji.GITHUB} Pull Request Update\n"
-        "PR #{{number}}: {{title}}\n"
-        "Status: {{status}}\n"
+        "PR #{number}: {title}\n"
+        "Status: {status}\n"
         f"{Emoji.LINK} {{url}}"
     )
 }
@@ -338,3 +361,66 @@ INVALID_REWARD_FORMAT = (
 )
 
 REWARD_SUCCESS = "✅ Successfully submitted reward of {amount} for instance {instance_id}"
+
+def _validate_all_templates() -> None:
+    """Check that every template declares placeholders it actually contains"""
+    for messages in (_COMMAND_TEMPLATES, _ERROR_TEMPLATES, _SUCCESS_TEMPLATES, _PROVIDER_TEMPLATES, _GITHUB_TEMPLATES):
+        for key, value in messages.items():
+            if not isinstance(value, MessageTemplate) or not value.placeholders:
+                continue
+            missing = set(value.placeholders) - set(_PLACEHOLDER_RE.findall(value.template))
+            if missing:
+                raise ValueError(f"Template {key!r} missing declared placeholders: {missing}")
+    for key, usage in COMMAND_USAGE.items():
+        if not usage.command.startswith('/'):
+            raise ValueError(f"Command usage {key!r} must start with '/': {usage.command}")
+
+def _flatten(messages: Dict[str, Union[MessageTemplate, str]]) -> Dict[str, str]:
+    """Unwrap templates into their plain template strings"""
+    return {
+        key: value.template if isinstance(value, MessageTemplate) else value
+        for key, value in messages.items()
+    }
+
+# Callers read plain strings from the *_MESSAGES dicts; the private template
+# dicts keep the metadata that _validate_all_templates checks.
+COMMAND_MESSAGES: Dict[str, str] = _flatten(_COMMAND_TEMPLATES)
+ERROR_MESSAGES: Dict[str, str] = _flatten(_ERROR_TEMPLATES)
+SUCCESS_MESSAGES: Dict[str, str] = _flatten(_SUCCESS_TEMPLATES)
+PROVIDER_MESSAGES: Dict[str, str] = _flatten(_PROVIDER_TEMPLATES)
+GITHUB_MESSAGES: Dict[str, str] = _flatten(_GITHUB_TEMPLATES)
+
+# Opt-in so production cold starts skip the check; set it in CI and development
+if os.getenv("BOT_DEBUG_TEMPLATES"):
+    _validate_all_templates()
+
+def _escape_static(messages: Dict[str, str]) -> Dict[str, str]:
+    """Escape the placeholder-free messages for MarkdownV2"""
+    return {key: escape_markdown(value) for key, value in messages.items() if '{' not in value}
+
+# MarkdownV2-escaped copies of the static messages, built once at import so the
+# send path can enqueue them with escaped=True instead of re-escaping each time
+WELCOME_MESSAGE_MD2 = escape_markdown(WELCOME_MESSAGE)
+ERROR_MESSAGES_MD2: Dict[str, str] = _escape_static(ERROR_MESSAGES)
+
+# Prebuilt formatters for the templates filled in on hot paths; each mirrors
+# its template above but interpolates directly instead of parsing with str.format
+ERROR_FORMATTERS: Dict[str, Callable[..., str]] = {
+    "invalid_command": lambda command: f"{EMOJI_ERROR} Unknown command: {command}",
+    "instance_creation_failed": lambda error: f"{EMOJI_ERROR} Failed to create instance: {error}",
+}
+
+SUCCESS_FORMATTERS: Dict[str, Callable[..., str]] = {
+    "wallet_balance": lambda balance, status: (
+        f"{EMOJI_INFO} *Wallet Balance*\n"
+        f"Balance: {balance} credits\n"
+        f"Status: {status}"
+    ),
+    "instance_created": lambda instance_id: (
+        f"{EMOJI_SUCCESS} Instance created!\n\n"
+        f"{EMOJI_SEARCH} Instance ID: `{instance_id}`\n"
+    ),
+    "reward_submitted": lambda amount, instance_id: (
+        f"{EMOJI_SUCCESS} Successfully submitted reward of {amount} for instance {instance_id}"
+    ),
+}
@@ -1,8 +1,15 @@
 from typing import Optional, Tuple
-import uuid
+import re
 from loguru import logger
-from services.client import AgentMarketClient
-from utils.telegram_utils import send_message
+from services.client import get_client
+from services.bot.message_queue import message_queue
+
+# @<provider uuid> [instance_id] message, parsed and UUID-checked in one match
+_MENTION_RE = re.compile(
+    r'@([0-9a-fA-F]{8}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{12})'
+    r'(?:\s+(\S+))?\s+(\S.*)',
+    re.DOTALL
+)
 
 async def send_message_to_provider(
     chat_id: int,
@@ -24,17 +31,17 @@ async def send_message_to_provider(
     if not instance_id:
         raise ValueError("Instance ID is required to send a message to a provider")
         
-    async with AgentMarketClient() as client:
-        try:
-            await client.send_message_in_conversation(
-                instance_id=instance_id,
-                message=content,
-                provider_id=provider_id
-            )
-            send_message(chat_id, f"✅ Message sent to provider `@{provider_id}`.")
-        except Exception as e:
-            logger.error(f"Error sending message to provider: {e}")
-            send_message(chat_id, "❌ Failed to send message to provider.")
+    client = get_client()
+    try:
+        await client.send_message_in_conversation(
+            instance_id=instance_id,
+            message=content,
+            provider_id=provider_id
+        )
+        await message_queue.enqueue(chat_id, f"✅ Message sent to provider `@{provider_id}`.")
+    except Exception as e:
+        logger.error(f"Error sending message to provider: {e}")
+        await message_queue.enqueue(chat_id, "❌ Failed to send message to provider.")
 
 def parse_provider_mention(text: str) -> Optional[Tuple[str, str, str]]:
     """Parse a provider mention from message text.
@@ -44,27 +51,8 @@ def parse_provider_mention(text: str) -> Optional[Tuple[str, str, str]]:
     Returns:
         Tuple of (provider_id, message_content, instance_id) or None if invalid
     """
-    if not text.startswith('@'):
-        return None
-        
-    parts = text.split(maxsplit=2)
-    if len(parts) < 2:
-        return None
-        
-    provider_id = parts[0][1:]  # Remove @ symbol
-    
-    # Check if second part is instance_id
-    if len(parts) == 3:
-        instance_id = parts[1]
-        message_content = parts[2]
-    else:
-        instance_id = None 
-        message_content = parts[1]
-    
-    # Validate provider_id is UUID
-    try:
-        uuid.UUID(provider_id)
-    except ValueError:
+    match = _MENTION_RE.match(text)
+    if not match:
         return None
-    
+    provider_id, instance_id, message_content = match.groups()
     return provider_id, message_content, instance_id
@@ -4,24 +4,38 @@ from typing import Dict, Optional, Any, List
 import os
 import aiohttp
 import asyncio
+import orjson
 from loguru import logger
 from utils.retry_utils import with_retry
+from services.client_session import get_session
+
+# Reduced timeout as per issue #21
+_REQUEST_TIMEOUT = aiohttp.ClientTimeout(total=15)
 
 class AgentMarketAPIError(Exception):
     """Raised when the Agent Market API returns an error response"""
-    pass
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
 
 class AgentMarketClient:
     def __init__(self, base_url: str = "https://api.agent.market/v1", api_key: str = None):
         self.base_url = base_url
+        # Prefix every endpoint is appended to, so _request only concatenates
+        self._base = base_url.rstrip('/') + '/'
         self.api_key = api_key or os.getenv("AGENT_MARKET_API_KEY")
         if not self.api_key:
             raise AgentMarketAPIError("API key not provided")
+        self._headers = {
+            "x-api-key": self.api_key,
+            "Content-Type": "application/json"
+        }
 
     async def __aenter__(self):
         return self
         
     async def __aexit__(self, exc_type, exc, tb):
+        # The HTTP session is shared process-wide and outlives the client
         pass
 
     @with_retry(max_attempts=3, min_wait=1, max_wait=10)
@@ -30,33 +44,41 @@ class AgentMarketClient:
         method: str,
         endpoint: str,
         params: Optional[Dict] = None,
-        json: Optional[Dict] = None
-    ) -> Dict[str, Any]:
-        """Make an authenticated request to the Agent Market API with retry capability"""
-        url = f"{self.base_url}/{endpoint.lstrip('/')}"
+        json: Optional[Dict] = None,
+        none_on_client_error: bool = False
+    ) -> Optional[Dict[str, Any]]:
+        """Make an authenticated request to the Agent Market API with retry capability.
+
+        With none_on_client_error set, a 4xx response returns None instead of
+        raising AgentMarketAPIError.
+        """
+        url = self._base + endpoint.lstrip('/')
         
         try:
-            async with aiohttp.ClientSession(headers={
-                "x-api-key": self.api_key,
-                "Content-Type": "application/json"
-            }) as session:
-                async with session.request(
-                    method,
-                    url,
-                    params=params,
-                    json=json,
-                    timeout=aiohttp.ClientTimeout(total=15)  # Reduced timeout as per issue #21
-                ) as response:
-                    if response.status >= 400:
-                        error_text = await response.text()
-                        if response.status >= 500:  # Server errors should trigger retry
-                            logger.warning(f"Server error ({response.status}) for {method} {url}: {error_text}")
-                            raise aiohttp.ClientError(f"Server error: {error_text}")
-                        else:  # Client errors should not retry
-                            raise AgentMarketAPIError(
-                                f"API request failed ({response.status}): {error_text}"
-                            )
-                    return await response.json()
+            async with get_session().request(
+                method,
+                url,
+                params=params,
+                json=json,
+                headers=self._headers,
+                timeout=_REQUEST_TIMEOUT
+            ) as response:
+                status = response.status
+                if status < 400:
+                    return await response.json(loads=orjson.loads)
+
+                error_text = await response.text()
+                if status >= 500:  # Server errors should trigger retry
+                    logger.warning(f"Server error ({status}) for {method} {url}: {error_text}")
+                    raise aiohttp.ClientError(f"Server error: {error_text}")
+                elif none_on_client_error:
+                    logger.debug("{} {} returned {}: {}", method, url, status, error_text)
+                    return None
+                else:  # Client errors should not retry
+                    raise AgentMarketAPIError(
+                        f"API request failed ({status}): {error_text}",
+                        status=status
+                    )
                     
         except (aiohttp.ClientError, asyncio.TimeoutError) as e:
             logger.error(f"Request failed for {method} {url}: {str(e)}")
@@ -80,11 +102,15 @@ class AgentMarketClient:
         response = await self._request("POST", endpoint, json=instance_data)
         return response
 
-    async def get_repository_issues(self, repo_url: str) -> List[Dict[str, Any]]:
-        """Retrieve issues from a repository using GET /repositories/issues."""
+    async def get_repository_issues(self, repo_url: str) -> Optional[List[Dict[str, Any]]]:
+        """Retrieve issues from a repository using GET /repositories/issues.
+
+        Returns None when the API rejects the lookup, e.g. for a repository
+        that has not been registered yet.
+        """
         endpoint = "github/repositories/issues"
         params = {"repo_url": repo_url}
-        response = await self._request("GET", endpoint, params=params)
+        response = await self._request("GET", endpoint, params=params, none_on_client_error=True)
         return response
 
     async def get_instances(self, instance_status: Optional[int] = None) -> List[Dict[str, Any]]:
@@ -146,3 +172,13 @@ class AgentMarketClient:
             AgentMarketAPIError: If the API request fails
         """
         endpoint = "wallet/balance"
+
+_client: Optional[AgentMarketClient] = None
+
+
+def get_client() -> AgentMarketClient:
+    """Return the process-wide Agent Market client, creating it on first use"""
+    global _client
+    if _client is None:
+        _client = AgentMarketClient()
+    return _client
@@ -0,0 +1,36 @@
+"""Process-wide aiohttp session shared by all outgoing HTTP calls.
+
+Reusing one session keeps connections to the Agent Market and Telegram APIs
+alive between requests instead of paying a TCP/TLS handshake per call.
+"""
+
+from typing import Optional
+import aiohttp
+import orjson
+
+_session: Optional[aiohttp.ClientSession] = None
+
+
+def _dumps(obj) -> str:
+    """Serialize request bodies passed as json= with orjson"""
+    return orjson.dumps(obj).decode()
+
+
+def get_session() -> aiohttp.ClientSession:
+    """Return the shared HTTP session, creating it on first use"""
+    global _session
+    if _session is None or _session.closed:
+        _session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=100, keepalive_timeout=75, ttl_dns_cache=300),
+            timeout=aiohttp.ClientTimeout(total=15),
+            json_serialize=_dumps
+        )
+    return _session
+
+
+async def close_session() -> None:
+    """Close the shared HTTP session"""
+    global _session
+    if _session is not None:
+        await _session.close()
+        _session = None
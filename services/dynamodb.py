@@ -0,0 +1,59 @@
+"""Process-wide DynamoDB resource shared by the request tracker and message storage.
+
+botocore's defaults wait up to 60 seconds to connect and retry blindly, so a
+brief DynamoDB slowdown stalls a worker thread for a long time. Tight timeouts
+with adaptive retries back off on throttling instead, and one pooled resource
+keeps connections alive between calls.
+
+Blocking calls run on one bounded thread pool shared by both modules. Only
+the low-level client is thread-safe, so calls made from that pool go through
+get_dynamodb().meta.client, never a resource Table.
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict
+import boto3
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+from botocore.config import Config as BotoConfig
+
+_DYNAMODB_CONFIG = BotoConfig(
+    max_pool_connections=50,
+    connect_timeout=1.0,
+    read_timeout=3.0,
+    retries={'max_attempts': 3, 'mode': 'adaptive'},
+    tcp_keepalive=True
+)
+
+# Dedicated, bounded pool for blocking boto3 calls so they stay off the event loop
+_BOTO_EXECUTOR = ThreadPoolExecutor(max_workers=8, thread_name_prefix='boto')
+
+# Convert between Python values and the low-level client's typed attribute values
+_SERIALIZER = TypeSerializer()
+_DESERIALIZER = TypeDeserializer()
+
+_dynamodb = None
+
+
+def get_dynamodb():
+    """Return the shared DynamoDB resource, creating it on first use"""
+    global _dynamodb
+    if _dynamodb is None:
+        _dynamodb = boto3.resource('dynamodb', config=_DYNAMODB_CONFIG)
+    return _dynamodb
+
+
+async def run_blocking(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Run a blocking boto3 call on the boto3 thread pool"""
+    return await asyncio.get_running_loop().run_in_executor(_BOTO_EXECUTOR, partial(func, *args, **kwargs))
+
+
+def to_attribute(value: Any) -> Dict[str, Any]:
+    """Convert a Python value to a typed attribute value for the low-level client"""
+    return _SERIALIZER.serialize(value)
+
+
+def from_attribute(value: Dict[str, Any]) -> Any:
+    """Convert a typed attribute value from the low-level client to a Python value"""
+    return _DESERIALIZER.deserialize(value)
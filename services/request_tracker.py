@@ -1,25 +1,60 @@
-from typing import Optional, Dict
-from botocore.exceptions import ClientError
-import boto3
 import asyncio
-from datetime import datetime, timedelta
+from typing import Any, ClassVar, Optional, Dict, List, Set
+from botocore.exceptions import ClientError
+from services.dynamodb import get_dynamodb, run_blocking, to_attribute
+import time
 from loguru import logger
 
+# Most keys DynamoDB accepts in a single batch_get_item call
+_BATCH_GET_LIMIT = 100
+
+# Tries per batch before unprocessed keys are given up on, and the first backoff
+# in seconds; throttled keys are retried with exponential backoff as AWS advises
+_BATCH_GET_ATTEMPTS = 4
+_BATCH_GET_BACKOFF = 0.05
+
+# Attributes the polling path reads; projected so responses stay small
+_TRACKED_PROJECTION = '#id, chat_id, last_processed_time'
+_TRACKED_NAMES = {'#id': 'id'}
+
+def _plain(item: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """Unwrap a low-level DynamoDB item into attribute values (numbers stay strings)"""
+    return {name: next(iter(value.values())) for name, value in item.items()}
+
 class RequestTracker:
     """Tracks active requests and their processing status"""
+
+    _instance: Optional['RequestTracker'] = None
+
+    # Tables already confirmed to exist in this process
+    _verified_tables: ClassVar[Set[str]] = set()
+
+    @classmethod
+    def instance(cls) -> 'RequestTracker':
+        """Return the process-wide tracker, creating it on first use"""
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
     
     def __init__(self):
-        self.dynamodb = boto3.resource('dynamodb')
+        self.dynamodb = get_dynamodb()
         self.table_name = 'agent_requests'
         self.table = self.dynamodb.Table(self.table_name)
+        # Low-level client for every call made from the boto3 pool; unlike the
+        # resource it is thread-safe, and it skips the resource's type marshalling
+        self.client = self.dynamodb.meta.client
         self._ensure_table_exists()
 
     def _ensure_table_exists(self) -> None:
         """Ensure the DynamoDB table exists, create if not"""
+        if self.table_name in RequestTracker._verified_tables:
+            return
         try:
             self.dynamodb.meta.client.describe_table(TableName=self.table_name)
         except self.dynamodb.meta.client.exceptions.ResourceNotFoundException:
             self._create_table()
+            return
+        RequestTracker._verified_tables.add(self.table_name)
 
     def _create_table(self) -> None:
         """Create the DynamoDB table"""
@@ -54,30 +89,36 @@ class RequestTracker:
                 }
             )
             table.meta.client.get_waiter('table_exists').wait(TableName=self.table_name)
-            logger.info(f"Table {self.table_name} created successfully.")
+            RequestTracker._verified_tables.add(self.table_name)
+            logger.info("Table {} created successfully.", self.table_name)
         except ClientError as e:
             logger.error(f"Error creating table {self.table_name}: {e}")
 
-    def update_last_processed_time(self, instance_id: str, timestamp: int) -> None:
+    async def update_last_processed_time(self, instance_id: str, timestamp: int) -> None:
         """Update the last processed time for an instance"""
         try:
-            self.table.update_item(
-                Key={'id': instance_id},
+            await run_blocking(
+                self.client.update_item,
+                TableName=self.table_name,
+                Key={'id': {'S': str(instance_id)}},
                 UpdateExpression='SET last_processed_time = :time',
-                ExpressionAttributeValues={':time': timestamp}
+                ExpressionAttributeValues={':time': {'N': str(timestamp)}}
             )
         except Exception as e:
             logger.error(f"Error updating last processed time: {e}")
     
-    def get_last_processed_time(self, instance_id: str) -> int:
+    async def get_last_processed_time(self, instance_id: str) -> int:
         """Get the last processed timestamp for an instance."""
         try:
-            response = self.table.get_item(
-                Key={'id': str(instance_id)}  # Remove ProjectionExpression to get all attributes
+            response = await run_blocking(
+                self.client.get_item,
+                TableName=self.table_name,
+                Key={'id': {'S': str(instance_id)}},
+                ProjectionExpression='last_processed_time'
             )
             
             item = response.get('Item', {})
-            return int(item.get('last_processed_time', 0))
+            return int(item['last_processed_time']['N']) if 'last_processed_time' in item else 0
             
         except Exception as e:
             logger.error(f"Error getting last processed time for instance {instance_id}: {e}")
@@ -86,7 +127,7 @@ class RequestTracker:
     async def add_request(self, instance_id: str, chat_id: int, metadata: Optional[Dict] = None) -> None:
         """Add a new active request"""
         try:
-            now = int(datetime.utcnow().timestamp())
+            now = int(time.time())
             item = {
                 'id': str(instance_id),  # Ensure id is string
                 'chat_id': str(chat_id),
@@ -98,25 +139,62 @@ class RequestTracker:
             if metadata:
                 item['metadata'] = metadata
                 
-            await asyncio.get_event_loop().run_in_executor(
-                None, 
-                lambda: self.table.put_item(Item=item)
+            await run_blocking(
+                self.client.put_item,
+                TableName=self.table_name,
+                Item={name: to_attribute(value) for name, value in item.items()}
             )
         except Exception as e:
             logger.error(f"Error adding request: {e}")
             raise
 
-    def get_chat_id_by_instance_id(self, instance_id: str) -> Optional[int]:
+    async def get_chat_id_by_instance_id(self, instance_id: str) -> Optional[int]:
         """Get chat_id associated with an instance_id."""
         try:
-            response = self.table.get_item(
-                Key={'id': str(instance_id)}  # Remove ProjectionExpression to get all attributes
+            response = await run_blocking(
+                self.client.get_item,
+                TableName=self.table_name,
+                Key={'id': {'S': str(instance_id)}},
+                ProjectionExpression='chat_id'
             )
             
             item = response.get('Item', {})
             chat_id = item.get('chat_id')
-            return int(chat_id) if chat_id is not None else None
+            return int(chat_id['S']) if chat_id is not None else None
             
         except Exception as e:
             logger.error(f"Error getting chat_id for instance {instance_id}: {e}")
             return None
+
+    async def get_many(self, instance_ids: List[str]) -> Dict[str, Dict]:
+        """Fetch chat_id and last_processed_time for many instances, keyed by instance id.
+
+        Reads in batches of up to 100 keys instead of one get_item per instance;
+        instances that are not tracked are missing from the result.
+        """
+        items: Dict[str, Dict] = {}
+        keys = list(dict.fromkeys(str(instance_id) for instance_id in instance_ids))
+        try:
+            for start in range(0, len(keys), _BATCH_GET_LIMIT):
+                request = {self.table_name: {
+                    'Keys': [{'id': {'S': key}} for key in keys[start:start + _BATCH_GET_LIMIT]],
+                    'ProjectionExpression': _TRACKED_PROJECTION,
+                    'ExpressionAttributeNames': _TRACKED_NAMES
+                }}
+                for attempt in range(_BATCH_GET_ATTEMPTS):
+                    if attempt:
+                        await asyncio.sleep(_BATCH_GET_BACKOFF * 2 ** (attempt - 1))
+                    response = await run_blocking(self.client.batch_get_item, RequestItems=request)
+                    for item in response.get('Responses', {}).get(self.table_name, []):
+                        item = _plain(item)
+                        items[item['id']] = item
+                    # Throttled reads come back unprocessed and have to be requested again
+                    request = response.get('UnprocessedKeys')
+                    if not request:
+                        break
+                else:
+                    unprocessed = len(request[self.table_name]['Keys'])
+                    logger.warning(f"Giving up on {unprocessed} unprocessed keys after {_BATCH_GET_ATTEMPTS} attempts")
+        except Exception as e:
+            logger.error(f"Error batch getting requests: {e}")
+        return items
@@ -0,0 +1,24 @@
+import os
+
+import pytest
+
+# Modules build their AWS and Telegram clients at import time; give them
+# harmless defaults so tests that fake those services can import them offline
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+os.environ.setdefault('GROUPWRITE_TELEGRAM_BOT_TOKEN', 'test-token')
+os.environ.setdefault('AGENT_MARKET_API_KEY', 'test-key')
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    """Capture Telegram sends from the message queue instead of calling the API"""
+    import services.bot.message_queue as mq
+
+    calls = []
+
+    async def fake_send_message(chat_id, text, parse_mode=None, escape=True):
+        calls.append((chat_id, text, parse_mode))
+        return {'ok': True}
+
+    monkeypatch.setattr(mq, 'send_message', fake_send_message)
+    return calls
@@ -0,0 +1,64 @@
+import pytest
+
+import bot_handlers
+
+CHAT_ID = -100
+INSTANCE_ID = 'aaaaaaaa-aaaa-4aaa-8aaa-aaaaaaaaaaaa'
+
+
+class FakeClient:
+    async def create_instance(self, instance_data):
+        return {'id': INSTANCE_ID}
+
+
+class FailingTracker:
+    async def add_request(self, instance_id, chat_id):
+        raise RuntimeError('DynamoDB unavailable')
+
+
+@pytest.mark.asyncio
+async def test_code_request_not_confirmed_when_tracking_fails(monkeypatch, sent):
+    async def fake_get_chat_history(chat_id):
+        return []
+
+    monkeypatch.setattr(bot_handlers, 'get_client', lambda: FakeClient())
+    monkeypatch.setattr(bot_handlers, 'get_chat_history', fake_get_chat_history)
+    monkeypatch.setattr(bot_handlers.RequestTracker, 'instance', classmethod(lambda cls: FailingTracker()))
+
+    message = {'chat': {'id': CHAT_ID}, 'text': '@group_code_bot add tests'}
+    with pytest.raises(RuntimeError):
+        await bot_handlers.handle_code_request(message)
+    await bot_handlers.message_queue.flush()
+
+    assert sent == []
+
+
+def test_repo_caches_forget_oldest_past_cap(monkeypatch):
+    monkeypatch.setattr(bot_handlers, 'MAX_CACHED_REPOS', 2)
+    repos = {}
+    for key in [('o', 'a'), ('o', 'b'), ('o', 'a'), ('o', 'c')]:
+        bot_handlers._remember_repo(repos, key)
+
+    assert list(repos) == [('o', 'a'), ('o', 'c')]
+
+
+def test_issue_cache_drops_expired_then_oldest(monkeypatch):
+    monkeypatch.setattr(bot_handlers, 'MAX_CACHED_ISSUES', 2)
+    monkeypatch.setattr(bot_handlers, '_issue_cache', {
+        ('o', 'old', 1): (0.0, {'issue_number': 1, 'instance_id': 'i'})
+    })
+
+    issues = [{'issue_number': n, 'instance_id': f'i{n}'} for n in (1, 2, 3)]
+    bot_handlers._cache_issues('o', 'r', issues)
+
+    assert list(bot_handlers._issue_cache) == [('o', 'r', 2), ('o', 'r', 3)]
+
+
+def test_history_drops_links_cut_off_by_truncation():
+    text = 'a' * (bot_handlers.MAX_MSG_CHARS - 5) + ' https://github.com/o/r/issues/1 and more'
+
+    history = bot_handlers._format_history([{'username': 'ada', 'text': text}])
+
+    line = history.splitlines()[-1]
+    assert line == 'ada: ' + ('a' * (bot_handlers.MAX_MSG_CHARS - 5) + '  and more')[:bot_handlers.MAX_MSG_CHARS]
+    assert 'http' not in line
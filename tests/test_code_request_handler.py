@@ -0,0 +1,38 @@
+import pytest
+
+import services.bot.handlers.code_request_handler as code_request_handler
+from services.bot.handlers.code_request_handler import CodeRequestHandler
+
+CHAT_ID = -100
+INSTANCE_ID = 'aaaaaaaa-aaaa-4aaa-8aaa-aaaaaaaaaaaa'
+
+
+class FakeClient:
+    async def create_instance(self, instance_data):
+        return {'id': INSTANCE_ID}
+
+
+class FailingTracker:
+    async def add_request(self, instance_id, chat_id):
+        raise RuntimeError('DynamoDB unavailable')
+
+
+@pytest.mark.asyncio
+async def test_code_request_not_confirmed_when_tracking_fails(monkeypatch, sent):
+    monkeypatch.setattr(code_request_handler, 'get_client', lambda: FakeClient())
+    monkeypatch.setattr(
+        code_request_handler.RequestTracker, 'instance', classmethod(lambda cls: FailingTracker())
+    )
+    handler = CodeRequestHandler()
+    message = handler.validate_message({
+        'message_id': 1,
+        'chat': {'id': CHAT_ID, 'type': 'supergroup'},
+        'date': 1738068403,
+        'text': '@group_write_bot add tests'
+    })
+
+    with pytest.raises(Exception):
+        await handler.handle(message, handler.create_context(message))
+    await code_request_handler.message_queue.flush()
+
+    assert sent == []
@@ -0,0 +1,73 @@
+import pytest
+
+import services.bot.github as github
+
+
+class FakeClient:
+    def __init__(self, issues):
+        self.issues = issues
+        self.issue_requests = []
+        self.added = []
+
+    async def get_repository_issues(self, repo_url):
+        self.issue_requests.append(repo_url)
+        return self.issues
+
+    async def add_repository(self, repo_data):
+        self.added.append(repo_data['repo_url'])
+
+
+@pytest.fixture(autouse=True)
+def empty_caches(monkeypatch):
+    monkeypatch.setattr(github, '_issues_by_repo', {})
+    monkeypatch.setattr(github, '_added_issues', {})
+
+
+@pytest.mark.asyncio
+async def test_issue_index_is_shared_by_a_repository():
+    repo_url = 'https://github.com/octo/repo'
+    client = FakeClient([
+        {'issue_number': 1, 'instance_id': 'i1'},
+        {'issue_number': 2, 'instance_id': 'i2'}
+    ])
+
+    first = await github._find_issue(client, repo_url, f'{repo_url}/issues/1', 1)
+    second = await github._find_issue(client, repo_url, f'{repo_url}/issues/2', 2)
+
+    assert (first['instance_id'], second['instance_id']) == ('i1', 'i2')
+    # The API is asked with the issue URL, once for the repository
+    assert client.issue_requests == [f'{repo_url}/issues/1']
+    assert list(github._issues_by_repo) == [repo_url]
+
+
+@pytest.mark.asyncio
+async def test_issue_index_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(github, 'MAX_CACHED_REPOS', 2)
+    client = FakeClient([{'issue_number': 1, 'instance_id': 'i1'}])
+
+    for name in ('a', 'b', 'c'):
+        repo_url = f'https://github.com/octo/{name}'
+        await github._find_issue(client, repo_url, f'{repo_url}/issues/1', 1)
+
+    assert list(github._issues_by_repo) == ['https://github.com/octo/b', 'https://github.com/octo/c']
+
+
+class FakeTracker:
+    async def add_request(self, instance_id, chat_id):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_each_issue_is_registered_once_and_remembered_within_bound(monkeypatch, sent):
+    monkeypatch.setattr(github, 'MAX_CACHED_ISSUES', 2)
+    client = FakeClient([{'issue_number': n, 'instance_id': f'i{n}', 'title': 'T'} for n in (1, 2, 3)])
+    monkeypatch.setattr(github, 'get_client', lambda: client)
+    monkeypatch.setattr(github.RequestTracker, 'instance', classmethod(lambda cls: FakeTracker()))
+
+    for issue_num in ('1', '1', '2', '3'):
+        await github.handle_github_issue(-100, 'octo', 'repo', issue_num)
+    await github.message_queue.flush()
+
+    base = 'https://github.com/octo/repo/issues'
+    assert client.added == [f'{base}/1', f'{base}/2', f'{base}/3']
+    assert list(github._added_issues) == [f'{base}/2', f'{base}/3']
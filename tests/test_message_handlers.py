@@ -0,0 +1,131 @@
+import pytest
+
+import services.bot.message_handlers as message_handlers
+from services.bot.message_handlers import MessageHandler
+from services.bot.message_types import NewChatMemberMessage, TextMessage
+
+CHAT_ID = -100
+PROVIDER_ID = '11111111-1111-4111-8111-111111111111'
+
+
+def raw_message(text=None, **extra):
+    message = {
+        'message_id': 1,
+        'from': {'id': 7, 'first_name': 'Ada', 'username': 'ada'},
+        'chat': {'id': CHAT_ID, 'type': 'supergroup'},
+        'date': 1738068403,
+        **extra
+    }
+    if text is not None:
+        message['text'] = text
+    return message
+
+
+async def dispatch(raw):
+    handler = MessageHandler()
+    message = handler.validate_message(raw)
+    await handler.handle(message, handler.create_context(message))
+    await message_handlers.message_queue.flush()
+    return message
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    """Record calls to the handlers MessageHandler routes to"""
+    recorded = []
+
+    def record(name):
+        async def fake(*args, **kwargs):
+            recorded.append((name, args, kwargs))
+        return fake
+
+    monkeypatch.setattr(message_handlers, 'handle_command', record('command'))
+    monkeypatch.setattr(message_handlers, 'send_message_to_provider', record('provider'))
+    monkeypatch.setattr(message_handlers, 'handle_github_issue', record('github'))
+    monkeypatch.setattr(message_handlers, 'set_bot_commands', record('set_commands'))
+
+    async def fake_code_request(self, message, context):
+        recorded.append(('code_request', (message.text,), {}))
+
+    monkeypatch.setattr(MessageHandler, 'handle_code_request', fake_code_request)
+    return recorded
+
+
+@pytest.mark.asyncio
+async def test_command_is_routed_with_raw_message(calls):
+    message = await dispatch(raw_message('/help'))
+
+    assert isinstance(message, TextMessage)
+    [(name, (raw,), _)] = calls
+    assert name == 'command'
+    assert raw['chat']['id'] == CHAT_ID
+    assert raw['text'] == '/help'
+
+
+@pytest.mark.asyncio
+async def test_provider_mention_is_forwarded(calls):
+    await dispatch(raw_message(f'@{PROVIDER_ID} inst-1 please fix it'))
+
+    assert calls == [
+        ('provider', (CHAT_ID, PROVIDER_ID, 'please fix it'), {'instance_id': 'inst-1'})
+    ]
+
+
+@pytest.mark.asyncio
+async def test_invalid_provider_mention_reports_format(calls, sent):
+    await dispatch(raw_message('@someone hello'))
+
+    assert calls == []
+    assert len(sent) == 1
+    assert sent[0][2] == 'MarkdownV2'
+
+
+@pytest.mark.asyncio
+async def test_github_issue_link_is_handled(calls):
+    await dispatch(raw_message('see https://github.com/octo/repo/issues/5'))
+
+    assert calls == [('github', (CHAT_ID, 'octo', 'repo', '5'), {})]
+
+
+@pytest.mark.asyncio
+async def test_github_link_without_issue_is_ignored(calls):
+    await dispatch(raw_message('see https://github.com/octo/repo'))
+
+    assert calls == []
+
+
+@pytest.mark.asyncio
+async def test_code_request_is_routed(calls):
+    await dispatch(raw_message('hey @group_write_bot add tests'))
+
+    assert calls == [('code_request', ('hey @group_write_bot add tests',), {})]
+
+
+@pytest.mark.asyncio
+async def test_blank_message_reports_empty(calls, sent):
+    await dispatch(raw_message('   '))
+
+    assert calls == []
+    assert len(sent) == 1
+
+
+@pytest.mark.asyncio
+async def test_bot_added_to_group_sets_commands_and_welcomes(calls, sent):
+    members = [
+        {'id': 8, 'first_name': 'Bob', 'username': 'bob'},
+        {'id': 9, 'is_bot': True, 'first_name': 'GroupCodeBot', 'username': 'group_code_bot'}
+    ]
+    message = await dispatch(raw_message(new_chat_members=members))
+
+    assert isinstance(message, NewChatMemberMessage)
+    assert calls == [('set_commands', (CHAT_ID,), {})]
+    assert len(sent) == 1
+    assert sent[0][2] == 'MarkdownV2'
+
+
+@pytest.mark.asyncio
+async def test_other_members_joining_is_ignored(calls, sent):
+    await dispatch(raw_message(new_chat_members=[{'id': 8, 'first_name': 'Bob'}]))
+
+    assert calls == []
+    assert sent == []
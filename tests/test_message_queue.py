@@ -0,0 +1,258 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import bot_handlers
+import services.bot.message_queue as mq
+import utils.message_utils as message_utils
+from services.bot.message_queue import MessageQueue, TokenBucket
+
+CHAT_ID = -100
+INSTANCE_ID = 'aaaaaaaa-aaaa-4aaa-8aaa-aaaaaaaaaaaa'
+PROVIDER_1 = '11111111-1111-4111-8111-111111111111'
+PROVIDER_2 = '22222222-2222-4222-8222-222222222222'
+
+
+class FakeClient:
+    def __init__(self, conversations):
+        self.conversations = conversations
+
+    async def get_instance_providers(self, instance_id):
+        return list(self.conversations)
+
+    async def get_conversation_messages(self, instance_id, provider_id):
+        return self.conversations[provider_id]
+
+
+def provider_message(text, second):
+    return {
+        'sender': 'provider',
+        'message': text,
+        'timestamp': f'2025-01-28T12:32:{second:02d}+00:00'
+    }
+
+
+@pytest.mark.asyncio
+async def test_reply_to_provider_notification_reaches_its_provider(monkeypatch, sent):
+    queue = MessageQueue()
+    monkeypatch.setattr(message_utils, 'message_queue', queue)
+    client = FakeClient({
+        PROVIDER_1: [provider_message('first', 1)],
+        PROVIDER_2: [provider_message('second', 2)]
+    })
+
+    await message_utils.process_instance_messages(client, None, INSTANCE_ID, 0, chat_id=CHAT_ID)
+    await queue.flush()
+
+    # Both notifications arrive in one queue window but stay separate messages
+    assert len(sent) == 2
+
+    forwarded = []
+
+    async def fake_send_message_to_provider(chat_id, provider_id, content, instance_id=None):
+        forwarded.append((provider_id, instance_id))
+
+    async def fake_get_chat_history(chat_id):
+        return []
+
+    monkeypatch.setattr(bot_handlers, 'send_message_to_provider', fake_send_message_to_provider)
+    monkeypatch.setattr(bot_handlers, 'get_chat_history', fake_get_chat_history)
+
+    for _, text, _ in sent:
+        reply = {'chat': {'id': CHAT_ID}, 'text': 'thanks'}
+        assert await bot_handlers.handle_provider_reply(reply, {'text': text})
+
+    assert forwarded == [(PROVIDER_1, INSTANCE_ID), (PROVIDER_2, INSTANCE_ID)]
+
+
+@pytest.mark.asyncio
+async def test_non_coalesced_message_is_not_merged(sent):
+    queue = MessageQueue()
+    await queue.enqueue(CHAT_ID, 'before')
+    await queue.enqueue(CHAT_ID, 'notification', coalesce=False)
+    await queue.enqueue(CHAT_ID, 'after')
+    await queue.flush()
+
+    assert [text for _, text, _ in sent] == ['before', 'notification', 'after']
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Fake monotonic clock for the queue; asyncio.sleep advances it instead of waiting"""
+    now = SimpleNamespace(value=0.0, slept=[])
+    real_sleep = asyncio.sleep
+
+    async def fake_sleep(delay, *args):
+        # The extra nanosecond keeps the clock moving, as a real one would,
+        # when a delay is too small to change it
+        now.value += delay + 1e-9
+        now.slept.append(delay)
+        await real_sleep(0)
+
+    monkeypatch.setattr(mq, 'time', SimpleNamespace(monotonic=lambda: now.value))
+    monkeypatch.setattr(asyncio, 'sleep', fake_sleep)
+    return now
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_paces_after_burst(clock):
+    bucket = TokenBucket(mq.GLOBAL_RATE_PER_SECOND, 1)
+    for _ in range(mq.GLOBAL_RATE_PER_SECOND):
+        await bucket.acquire()
+    assert clock.value == 0
+
+    await bucket.acquire()
+    assert clock.value == pytest.approx(1 / mq.GLOBAL_RATE_PER_SECOND)
+
+
+@pytest.mark.asyncio
+async def test_global_limit_spans_chats(clock, sent):
+    queue = MessageQueue()
+    for chat_id in range(1, 2 * mq.GLOBAL_RATE_PER_SECOND + 1):
+        await queue.enqueue(chat_id, 'hello')
+    await queue.flush()
+
+    assert len(sent) == 2 * mq.GLOBAL_RATE_PER_SECOND
+    # The first 30 go out as a burst, the next 30 at 30 per second
+    assert clock.value == pytest.approx(1.0)
+
+
+@pytest.mark.asyncio
+async def test_group_limit_is_per_chat(clock, sent):
+    queue = MessageQueue()
+    for i in range(mq.CHAT_RATE_PER_MINUTE + 1):
+        await queue.enqueue(CHAT_ID, f'notification {i}', coalesce=False)
+    await queue.flush()
+
+    assert len(sent) == mq.CHAT_RATE_PER_MINUTE + 1
+    assert clock.value == pytest.approx(60 / mq.CHAT_RATE_PER_MINUTE)
+
+
+@pytest.mark.asyncio
+async def test_private_chats_have_no_per_chat_limit(clock, sent):
+    queue = MessageQueue()
+    for i in range(mq.CHAT_RATE_PER_MINUTE + 1):
+        await queue.enqueue(42, f'notification {i}', coalesce=False)
+    await queue.flush()
+
+    assert len(sent) == mq.CHAT_RATE_PER_MINUTE + 1
+    assert clock.value == 0
+
+
+def rate_limited(retry_after):
+    return {'ok': False, 'error_code': 429, 'parameters': {'retry_after': retry_after}}
+
+
+@pytest.fixture
+def responses(monkeypatch):
+    """Make sends return queued responses, then success"""
+    pending = []
+    attempts = []
+
+    async def fake_send_message(chat_id, text, parse_mode=None, escape=True):
+        attempts.append(text)
+        return pending.pop(0) if pending else {'ok': True}
+
+    monkeypatch.setattr(mq, 'send_message', fake_send_message)
+    return SimpleNamespace(pending=pending, attempts=attempts)
+
+
+@pytest.mark.asyncio
+async def test_rate_limited_send_waits_retry_after(clock, responses):
+    responses.pending.append(rate_limited(5))
+    queue = MessageQueue()
+    await queue.enqueue(CHAT_ID, 'hello')
+    await queue.flush()
+
+    assert responses.attempts == ['hello', 'hello']
+    assert 5 in clock.slept
+
+
+@pytest.mark.asyncio
+async def test_rate_limited_send_backs_off_exponentially(clock, responses):
+    responses.pending.extend([rate_limited(0), rate_limited(0)])
+    queue = MessageQueue()
+    await queue.enqueue(CHAT_ID, 'hello')
+    await queue.flush()
+
+    assert len(responses.attempts) == 3
+    assert [d for d in clock.slept if d >= 1] == [1, 2]
+
+
+@pytest.mark.asyncio
+async def test_rate_limited_send_gives_up(clock, responses):
+    responses.pending.extend([rate_limited(1)] * (mq.MAX_SEND_ATTEMPTS + 1))
+    queue = MessageQueue()
+    await queue.enqueue(CHAT_ID, 'hello')
+    await queue.flush()
+
+    assert len(responses.attempts) == mq.MAX_SEND_ATTEMPTS
+
+
+@pytest.mark.asyncio
+async def test_chat_order_kept_across_windows(monkeypatch):
+    release = asyncio.Event()
+    order = []
+
+    async def slow_send_message(chat_id, text, parse_mode=None, escape=True):
+        if text == 'first':
+            # The first window is still sending when the second one flushes
+            await release.wait()
+        order.append(text)
+        return {'ok': True}
+
+    monkeypatch.setattr(mq, 'send_message', slow_send_message)
+    queue = MessageQueue(flush_interval=0)
+    await queue.enqueue(CHAT_ID, 'first')
+    await asyncio.sleep(0.01)
+    await queue.enqueue(CHAT_ID, 'second')
+    flushing = asyncio.ensure_future(queue.flush())
+    await asyncio.sleep(0.01)
+    assert order == []
+
+    release.set()
+    await flushing
+    assert order == ['first', 'second']
+
+
+@pytest.mark.asyncio
+async def test_window_coalesces_and_drops_back_to_back_repeats(sent):
+    queue = MessageQueue()
+    for text in ['a', 'a', 'b', 'a']:
+        await queue.enqueue(CHAT_ID, text)
+    await queue.enqueue(CHAT_ID, 'formatted', parse_mode='MarkdownV2', escaped=True)
+    await queue.flush()
+
+    sep = mq.MESSAGE_SEPARATOR
+    assert [(text, mode) for _, text, mode in sent] == [
+        (f'a{sep}b{sep}a', None),
+        ('formatted', 'MarkdownV2')
+    ]
+
+
+@pytest.mark.asyncio
+async def test_coalesced_messages_stay_under_telegram_limit(sent):
+    queue = MessageQueue()
+    for i in range(3):
+        await queue.enqueue(CHAT_ID, str(i) * (mq.MAX_MESSAGE_LENGTH // 2))
+    await queue.flush()
+
+    assert len(sent) == 3
+    assert all(len(text) <= mq.MAX_MESSAGE_LENGTH for _, text, _ in sent)
+
+
+@pytest.mark.asyncio
+async def test_idle_chat_buckets_are_dropped(clock, sent, monkeypatch):
+    monkeypatch.setattr(mq, 'MAX_CHAT_BUCKETS', 3)
+    queue = MessageQueue()
+    for chat_id in (-1, -2, -3):
+        await queue.enqueue(chat_id, 'hello')
+    await queue.flush()
+
+    # A minute later every bucket has refilled and can be recreated fresh
+    clock.value += 60
+    await queue.enqueue(-4, 'hello')
+    await queue.flush()
+
+    assert list(queue._chat_buckets) == [-4]
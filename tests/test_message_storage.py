@@ -0,0 +1,209 @@
+import re
+
+import pytest
+from botocore.exceptions import ClientError
+
+import utils.message_storage as message_storage
+from services.dynamodb import from_attribute, to_attribute
+
+CHAT_ID = -100
+
+
+class FakeHistoryClient:
+    """In-memory stand-in for the low-level DynamoDB client, covering the
+    update expressions message_storage issues"""
+
+    def __init__(self, max_item_messages=None):
+        self.items = {}
+        self.calls = []
+        # Reject writes that would leave more messages than this, like DynamoDB's item size cap
+        self.max_item_messages = max_item_messages
+
+    def messages(self, chat_id=CHAT_ID):
+        return self.items.get(str(chat_id), {}).get('messages', [])
+
+    def get_item(self, TableName, Key, ProjectionExpression=None):
+        self.calls.append(('get_item', ProjectionExpression))
+        item = self.items.get(Key['id']['S'])
+        if item is None:
+            return {}
+        return {'Item': {'messages': to_attribute(item['messages'])}}
+
+    def update_item(self, TableName, Key, UpdateExpression, ExpressionAttributeValues,
+                    ConditionExpression=None):
+        self.calls.append(('update_item', UpdateExpression))
+        values = {name: from_attribute(value) for name, value in ExpressionAttributeValues.items()}
+        item = self.items.setdefault(Key['id']['S'], {'id': Key['id']['S']})
+        messages = item.get('messages')
+
+        if ConditionExpression == 'attribute_not_exists(messages)':
+            if messages is not None:
+                raise ClientError(
+                    {'Error': {'Code': 'ConditionalCheckFailedException', 'Message': 'failed'}},
+                    'UpdateItem'
+                )
+        elif ConditionExpression is not None:
+            size = len(messages or [])
+            op, name = re.fullmatch(r'size\(messages\) (=|>) (:\w+)', ConditionExpression).groups()
+            if not (size == values[name] if op == '=' else size > values[name]):
+                raise ClientError(
+                    {'Error': {'Code': 'ConditionalCheckFailedException', 'Message': 'failed'}},
+                    'UpdateItem'
+                )
+
+        if UpdateExpression.startswith('SET messages = list_append'):
+            updated = list(messages if messages is not None else values[':empty']) + values[':new']
+            item.setdefault('reactions', values[':no_reactions'])
+        elif UpdateExpression.startswith('REMOVE '):
+            removed = {int(i) for i in re.findall(r'messages\[(\d+)\]', UpdateExpression)}
+            updated = [m for i, m in enumerate(messages) if i not in removed]
+        else:
+            updated = values[re.fullmatch(r'SET messages = (:\w+)', UpdateExpression).group(1)]
+
+        if self.max_item_messages is not None and len(updated) > self.max_item_messages:
+            raise ClientError(
+                {'Error': {'Code': 'ValidationException',
+                           'Message': 'Item size has exceeded the maximum allowed size'}},
+                'UpdateItem'
+            )
+        item['messages'] = updated
+        return {}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    client = FakeHistoryClient()
+    monkeypatch.setattr(message_storage.Config, '_client', client)
+    # Threaded calls must not go through the resource table
+    monkeypatch.setattr(message_storage.Config, '_table', None)
+    message_storage._pending_messages.clear()
+    message_storage.clear_history_cache()
+    return client
+
+
+def telegram_message(message_id, text='hi'):
+    return {
+        'message_id': message_id,
+        'from': {'id': 7, 'first_name': 'Ada', 'username': 'ada'},
+        'chat': {'id': CHAT_ID},
+        'date': 1738068403 + message_id,
+        'text': text
+    }
+
+
+@pytest.mark.asyncio
+async def test_history_round_trip_through_client(client):
+    message_storage.store_message(CHAT_ID, telegram_message(1, 'hello'))
+    history = await message_storage.get_chat_history(CHAT_ID)
+
+    assert [m['text'] for m in history] == ['hello']
+    assert history[0]['username'] == 'ada'
+    assert ('get_item', 'messages') in client.calls
+
+    await message_storage.clear_chat_history(CHAT_ID)
+    assert client.messages() == []
+
+
+def test_writes_cap_history_without_reads(client):
+    for message_id in range(250):
+        message_storage.store_message(CHAT_ID, telegram_message(message_id))
+        message_storage.flush_messages()
+
+    stored = client.messages()
+    assert len(stored) == message_storage.MAX_STORED_MESSAGES
+    assert [m['message_id'] for m in stored] == list(range(150, 250))
+    assert not any(call[0] == 'get_item' for call in client.calls)
+
+
+def test_batch_crossing_cap_stays_under_it(client):
+    for message_id in range(98):
+        message_storage.store_message(CHAT_ID, telegram_message(message_id))
+    message_storage.flush_messages()
+    for message_id in range(98, 103):
+        message_storage.store_message(CHAT_ID, telegram_message(message_id))
+    message_storage.flush_messages()
+
+    stored = client.messages()
+    assert len(stored) <= message_storage.MAX_STORED_MESSAGES
+    assert stored[-1]['message_id'] == 102
+
+
+@pytest.mark.asyncio
+async def test_read_trims_oversized_history(client):
+    client.items[str(CHAT_ID)] = {
+        'messages': [{'text': str(i), 'message_id': i} for i in range(130)]
+    }
+
+    history = await message_storage.get_chat_history(CHAT_ID)
+
+    assert [m['message_id'] for m in history] == list(range(30, 130))
+    assert [m['message_id'] for m in client.messages()] == list(range(30, 130))
+
+
+def test_full_item_keeps_newest_messages(client):
+    client.items[str(CHAT_ID)] = {
+        'messages': [{'text': str(i), 'message_id': i} for i in range(40)]
+    }
+    # Pretend a few long messages mean only 40 fit in the item
+    client.max_item_messages = 40
+
+    message_storage.store_message(CHAT_ID, telegram_message(40))
+    message_storage.flush_messages()
+
+    stored = [m['message_id'] for m in client.messages()]
+    assert stored[-1] == 40
+    assert 0 < len(stored) <= 40
+    assert stored == list(range(41 - len(stored), 41))
+
+
+def test_burst_is_one_list_append_that_creates_the_item(client):
+    for message_id in range(3):
+        message_storage.store_message(CHAT_ID, telegram_message(message_id))
+    message_storage.flush_messages()
+
+    appends = [expr for method, expr in client.calls if 'list_append' in (expr or '')]
+    assert appends == [
+        'SET messages = list_append(if_not_exists(messages, :empty), :new), '
+        'reactions = if_not_exists(reactions, :no_reactions)'
+    ]
+    item = client.items[str(CHAT_ID)]
+    assert [m['message_id'] for m in item['messages']] == [0, 1, 2]
+    assert item['reactions'] == {}
+
+
+def test_append_keeps_existing_history_and_reactions(client):
+    client.items[str(CHAT_ID)] = {
+        'messages': [{'text': 'old', 'message_id': 0}],
+        'reactions': {'0': 'thumbs up'}
+    }
+
+    message_storage.store_message(CHAT_ID, telegram_message(1))
+    message_storage.flush_messages()
+
+    item = client.items[str(CHAT_ID)]
+    assert [m['message_id'] for m in item['messages']] == [0, 1]
+    assert item['reactions'] == {'0': 'thumbs up'}
+
+
+def test_full_item_reset_keeps_messages_appended_after_its_read(client):
+    client.items[str(CHAT_ID)] = {
+        'messages': [{'text': str(i), 'message_id': i} for i in range(40)]
+    }
+    client.max_item_messages = 40
+    get_item = client.get_item
+
+    def racing_get_item(**kwargs):
+        # Another instance appends right after the first read, as if it raced the reset
+        response = get_item(**kwargs)
+        if len(client.messages()) == 40:
+            client.items[str(CHAT_ID)]['messages'].append({'text': 'other', 'message_id': 99})
+        return response
+
+    client.get_item = racing_get_item
+    message_storage.store_message(CHAT_ID, telegram_message(40))
+    message_storage.flush_messages()
+
+    stored = [m['message_id'] for m in client.messages()]
+    assert stored[-2:] == [99, 40]
+    assert 0 < len(stored) <= 40
+    assert sum(method == 'get_item' for method, _ in client.calls) == 2
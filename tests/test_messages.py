@@ -0,0 +1,35 @@
+import inspect
+
+import pytest
+
+from services.bot import messages
+from services.bot.messages import MessageCategory, MessageTemplate
+
+
+def test_templates_declare_only_placeholders_they_contain():
+    messages._validate_all_templates()
+
+
+def test_template_validation_catches_undeclared_placeholder(monkeypatch):
+    broken = MessageTemplate(
+        template="Issue #{number}",
+        category=MessageCategory.GITHUB,
+        placeholders=["number", "title"]
+    )
+    monkeypatch.setitem(messages._GITHUB_TEMPLATES, "broken", broken)
+
+    with pytest.raises(ValueError, match="broken"):
+        messages._validate_all_templates()
+
+
+@pytest.mark.parametrize("formatters, templates", [
+    (messages.ERROR_FORMATTERS, messages.ERROR_MESSAGES),
+    (messages.SUCCESS_FORMATTERS, messages.SUCCESS_MESSAGES),
+])
+def test_formatters_match_their_templates(formatters, templates):
+    for key, formatter in formatters.items():
+        names = inspect.signature(formatter).parameters
+        args = [f"<{name}>" for name in names]
+        # Templates use either named or positional placeholders; format ignores the unused form
+        expected = templates[key].format(*args, **dict(zip(names, args)))
+        assert formatter(*args) == expected, key
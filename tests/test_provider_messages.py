@@ -0,0 +1,69 @@
+import pytest
+
+import bot_handlers
+import main
+
+CHAT_ID = -100
+INSTANCES = {
+    'aaaaaaaa-aaaa-4aaa-8aaa-aaaaaaaaaaaa': '11111111-1111-4111-8111-111111111111',
+    'bbbbbbbb-bbbb-4bbb-8bbb-bbbbbbbbbbbb': '22222222-2222-4222-8222-222222222222',
+}
+
+
+class FakeTracker:
+    def __init__(self):
+        self.updated = {}
+
+    async def get_many(self, instance_ids):
+        return {
+            instance_id: {'id': instance_id, 'chat_id': CHAT_ID, 'last_processed_time': 0}
+            for instance_id in instance_ids
+        }
+
+    async def update_last_processed_time(self, instance_id, timestamp):
+        self.updated[instance_id] = timestamp
+
+
+class FakeClient:
+    async def get_instances(self, instance_status):
+        return [{'id': instance_id} for instance_id in INSTANCES]
+
+    async def get_instance_providers(self, instance_id):
+        return [INSTANCES[instance_id]]
+
+    async def get_conversation_messages(self, instance_id, provider_id):
+        return [{
+            'sender': 'provider',
+            'message': f'done with {instance_id}',
+            'timestamp': '2025-01-28T12:32:50+00:00'
+        }]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_instances_in_one_chat_reply_to_their_own_provider(monkeypatch, sent):
+    tracker = FakeTracker()
+    monkeypatch.setattr(main.RequestTracker, 'instance', classmethod(lambda cls: tracker))
+    monkeypatch.setattr(main, 'get_client', lambda: FakeClient())
+
+    await main.process_provider_messages()
+
+    # Instances are processed concurrently, so both notifications share a queue window
+    assert len(sent) == len(INSTANCES)
+    assert set(tracker.updated) == set(INSTANCES)
+
+    forwarded = []
+
+    async def fake_send_message_to_provider(chat_id, provider_id, content, instance_id=None):
+        forwarded.append((instance_id, provider_id))
+
+    async def fake_get_chat_history(chat_id):
+        return []
+
+    monkeypatch.setattr(bot_handlers, 'send_message_to_provider', fake_send_message_to_provider)
+    monkeypatch.setattr(bot_handlers, 'get_chat_history', fake_get_chat_history)
+
+    for _, text, _ in sent:
+        reply = {'chat': {'id': CHAT_ID}, 'text': 'thanks'}
+        assert await bot_handlers.handle_provider_reply(reply, {'text': text})
+
+    assert sorted(forwarded) == sorted(INSTANCES.items())
@@ -0,0 +1,101 @@
+import pytest
+
+import services.request_tracker as request_tracker
+from services.request_tracker import RequestTracker
+
+
+class FakeClient:
+    """Low-level DynamoDB client that records calls"""
+
+    def __init__(self):
+        self.calls = []
+        # batch_get_item leaves every key unprocessed this many times
+        self.throttled = 0
+
+    def update_item(self, **kwargs):
+        self.calls.append(('update_item', kwargs))
+        return {}
+
+    def put_item(self, **kwargs):
+        self.calls.append(('put_item', kwargs))
+        return {}
+
+    def batch_get_item(self, RequestItems):
+        self.calls.append(('batch_get_item', RequestItems))
+        if self.throttled:
+            self.throttled -= 1
+            return {'Responses': {}, 'UnprocessedKeys': RequestItems}
+        [(table, request)] = RequestItems.items()
+        items = [{'id': key['id'], 'chat_id': {'S': '-100'}} for key in request['Keys']]
+        return {'Responses': {table: items}, 'UnprocessedKeys': {}}
+
+
+@pytest.fixture
+def tracker():
+    # Skip __init__, which talks to DynamoDB; the resource table must not be used
+    # from the thread pool, so leave it unset
+    tracker = RequestTracker.__new__(RequestTracker)
+    tracker.table_name = 'agent_requests'
+    tracker.table = None
+    tracker.client = FakeClient()
+    return tracker
+
+
+@pytest.mark.asyncio
+async def test_update_last_processed_time_uses_client(tracker):
+    await tracker.update_last_processed_time('inst-1', 1738068403)
+
+    assert tracker.client.calls == [('update_item', {
+        'TableName': 'agent_requests',
+        'Key': {'id': {'S': 'inst-1'}},
+        'UpdateExpression': 'SET last_processed_time = :time',
+        'ExpressionAttributeValues': {':time': {'N': '1738068403'}}
+    })]
+
+
+@pytest.mark.asyncio
+async def test_add_request_uses_client(tracker):
+    await tracker.add_request('inst-1', -100, metadata={'labels': ['bug']})
+
+    [(method, kwargs)] = tracker.client.calls
+    assert method == 'put_item'
+    item = kwargs['Item']
+    assert item['id'] == {'S': 'inst-1'}
+    assert item['chat_id'] == {'S': '-100'}
+    assert item['active'] == {'BOOL': True}
+    assert item['status'] == {'S': 'pending'}
+    assert item['metadata'] == {'M': {'labels': {'L': [{'S': 'bug'}]}}}
+    assert item['created_at'] == item['last_processed_time']
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    delays = []
+
+    async def fake_sleep(delay):
+        delays.append(delay)
+
+    monkeypatch.setattr(request_tracker.asyncio, 'sleep', fake_sleep)
+    return delays
+
+
+@pytest.mark.asyncio
+async def test_get_many_backs_off_before_retrying_unprocessed_keys(tracker, sleeps):
+    tracker.client.throttled = 2
+
+    items = await tracker.get_many(['inst-1', 'inst-2'])
+
+    assert set(items) == {'inst-1', 'inst-2'}
+    assert len(tracker.client.calls) == 3
+    assert sleeps == [request_tracker._BATCH_GET_BACKOFF, request_tracker._BATCH_GET_BACKOFF * 2]
+
+
+@pytest.mark.asyncio
+async def test_get_many_gives_up_after_attempt_cap(tracker, sleeps):
+    tracker.client.throttled = 100
+
+    items = await tracker.get_many(['inst-1'])
+
+    assert items == {}
+    assert len(tracker.client.calls) == request_tracker._BATCH_GET_ATTEMPTS
+    assert len(sleeps) == request_tracker._BATCH_GET_ATTEMPTS - 1
@@ -8,11 +8,13 @@ This module provides a comprehensive error handling framework including:
 """
 
 import sys
+import time
+import inspect
 import traceback
-import json
 import logging
+import orjson
 from datetime import datetime
-from typing import Any, Dict, Optional, Type, Callable, TypeVar
+from typing import Any, Dict, Optional, Tuple, Type, Callable, TypeVar, Union
 from functools import wraps
 from contextlib import contextmanager
 from pathlib import Path
@@ -64,10 +66,28 @@ class ErrorContext:
     ):
         self.error_type = error_type
         self.message = message
-        self.timestamp = datetime.utcnow()
-        self.stack_trace = traceback.format_exc()
+        self._created = time.time()
+        # Keep the exception being handled; it is only formatted if the context is read
+        self._exc_info = sys.exc_info()
+        self._stack_trace: Optional[str] = None
         self.additional_context = kwargs
 
+    @property
+    def timestamp(self) -> datetime:
+        """UTC time the error was created"""
+        return datetime.utcfromtimestamp(self._created)
+
+    @property
+    def stack_trace(self) -> str:
+        """Formatted traceback of the exception being handled when the error was created"""
+        if self._stack_trace is None:
+            # Empty when the context was created outside an except block
+            self._stack_trace = (
+                ''.join(traceback.format_exception(*self._exc_info)) if self._exc_info[0] else ''
+            )
+            self._exc_info = (None, None, None)
+        return self._stack_trace
+
     def to_dict(self) -> Dict[str, Any]:
         """Convert error context to dictionary format."""
         return {
@@ -79,7 +99,7 @@ class ErrorContext:
         }
 
     def __str__(self) -> str:
-        return json.dumps(self.to_dict(), indent=2)
+        return orjson.dumps(self.to_dict()).decode()
 
 def setup_logging(
     log_level: str = "INFO",
@@ -105,10 +125,12 @@ def setup_logging(
     }
     
     if json_format:
-        format_func = lambda record: json.dumps({
-            **log_format,
-            "exception": record["exception"]
-        })
+        # Records without an exception all share one line template, serialized once
+        plain_format = orjson.dumps({**log_format, "exception": None}).decode()
+        format_func = lambda record: plain_format if record["exception"] is None else orjson.dumps(
+            {**log_format, "exception": record["exception"]},
+            default=str
+        ).decode()
     else:
         format_func = "{time:YYYY-MM-DD HH:mm:ss.SSS} | {level: <8} | {message}"
 
@@ -152,26 +174,47 @@ def handle_error(
     raise error_type(message, **kwargs)
 
 def error_handler(
-    error_type: Type[BaseError]
+    error_type: Union[Type[BaseError], Tuple[Type[BaseError], ...]]
 ) -> Callable[[F], F]:
     """Decorator to wrap functions with error handling.
     
     Args:
-        error_type: Type of error to catch and re-raise
+        error_type: Type of error to catch and re-raise, or a tuple of types.
+            Errors already of one of the types propagate unchanged; anything
+            else is re-raised as the first type.
     """
+    error_types = error_type if isinstance(error_type, tuple) else (error_type,)
+    wrap_type = error_types[0]
+    wrap_name = wrap_type.__name__
+
     def decorator(func: F) -> F:
+        func_name = func.__name__
+
+        def wrap(e: Exception, args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> BaseError:
+            # Bound rather than passed as format kwargs, so braces in the message are safe
+            logger.bind(error_type=wrap_name, function=func_name).error(str(e))
+            return wrap_type(str(e), function=func_name, args=args, kwargs=kwargs)
+
+        if inspect.iscoroutinefunction(func):
+            # Coroutines raise when awaited, so the handler has to await them itself
+            @wraps(func)
+            async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                try:
+                    return await func(*args, **kwargs)
+                except error_types:
+                    raise
+                except Exception as e:
+                    raise wrap(e, args, kwargs) from e
+            return async_wrapper  # type: ignore
+
         @wraps(func)
         def wrapper(*args: Any, **kwargs: Any) -> Any:
             try:
                 return func(*args, **kwargs)
+            except error_types:
+                raise
             except Exception as e:
-                handle_error(
-                    error_type,
-                    str(e),
-                    function=func.__name__,
-                    args=args,
-                    kwargs=kwargs
-                )
+                raise wrap(e, args, kwargs) from e
         return wrapper  # type: ignore
     return decorator
 
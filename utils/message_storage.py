@@ -1,15 +1,32 @@
 """Utility functions for message storage and retrieval."""
 
 import os
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Union
 from datetime import datetime
 from loguru import logger
-import boto3
+from botocore.exceptions import ClientError
+from services.dynamodb import get_dynamodb, run_blocking, to_attribute, from_attribute
+
+# Most messages kept in a chat's stored history
+MAX_STORED_MESSAGES = 100
 
 class Config:
     """DynamoDB configuration"""
-    _dynamodb = boto3.resource('dynamodb')
-    _table = _dynamodb.Table(os.environ.get('DYNAMODB_TABLE_NAME', 'agent_requests'))
+    _dynamodb = get_dynamodb()
+    _table_name = os.environ.get('DYNAMODB_TABLE_NAME', 'agent_requests')
+    _table = _dynamodb.Table(_table_name)
+    # Calls run on the boto3 thread pool, where only the low-level client is safe to share
+    _client = _dynamodb.meta.client
+
+def _key(chat_id_str: str) -> Dict[str, Dict[str, str]]:
+    """Low-level client key of a chat's history item"""
+    return {'id': {'S': chat_id_str}}
+
+# Messages waiting to be written, by chat ID
+_pending_messages: Dict[str, List[Dict[str, Any]]] = {}
+
+# Histories already read while handling the current update, by chat ID
+_history_cache: Dict[str, List[Dict[str, Any]]] = {}
 
 async def get_chat_history(chat_id: int, limit: int = 100) -> List[Dict[str, Any]]:
     """Fetch recent messages from chat history stored in DynamoDB"""
@@ -23,14 +40,28 @@ async def get_chat_history(chat_id: int, limit: int = 100) -> List[Dict[str, Any
         if not chat_id_str:
             raise ValueError("chat_id cannot be empty")
             
-        # Get messages from DynamoDB
-        response = Config._table.get_item(
-            Key={'id': chat_id_str}
-        )
-        
-        # Get messages array from item, default to empty list if not found
-        item = response.get('Item', {})
-        messages = item.get('messages', [])
+        messages = _history_cache.get(chat_id_str)
+        if messages is None:
+            # Make sure messages still buffered for this chat are included
+            await run_blocking(flush_messages, chat_id_str)
+
+            # Get messages from DynamoDB without blocking the event loop, leaving
+            # the rest of the item behind
+            response = await run_blocking(
+                Config._client.get_item,
+                TableName=Config._table_name,
+                Key=_key(chat_id_str),
+                ProjectionExpression='messages'
+            )
+            
+            # Get messages array from item, default to empty list if not found
+            stored = response.get('Item', {}).get('messages')
+            messages = from_attribute(stored) if stored is not None else []
+            if len(messages) > MAX_STORED_MESSAGES:
+                stored_count = len(messages)
+                messages = messages[-MAX_STORED_MESSAGES:]
+                await run_blocking(_trim_messages, chat_id_str, stored_count, messages)
+            _history_cache[chat_id_str] = messages
         
         # Return most recent messages up to limit
         return messages[-limit:]
@@ -40,7 +71,11 @@ async def get_chat_history(chat_id: int, limit: int = 100) -> List[Dict[str, Any
         return []
 
 def store_message(chat_id: int, message: Dict[str, Any]) -> None:
-    """Store a new message in the chat history"""
+    """Queue a new message for the chat history.
+
+    Messages are buffered per chat and written by flush_messages, so a burst
+    of messages for a chat costs one list_append update instead of one each.
+    """
     try:
         # Ensure chat_id is properly formatted
         if not isinstance(chat_id, (int, str)):
@@ -68,38 +103,142 @@ def store_message(chat_id: int, message: Dict[str, Any]) -> None:
             'is_bot_message': is_bot_message
         }
         
-        # Get existing messages
-        response = Config._table.get_item(
-            Key={'id': chat_id_str}
-        )
-        
-        # Initialize messages list, either from existing item or as empty list
-        item = response.get('Item')
-        
-        if item is None:
-            # Create new item if it doesn't exist
-            Config._table.put_item(
-                Item={
-                    'id': chat_id_str,
-                    'messages': [message_with_user],
-                    'reactions': {}
-                }
-            )
-        else:
-            # Add new message to existing item
-            messages = item.get('messages', [])
-            messages.append(message_with_user)
-            messages = messages[-100:]  # Keep only last 100 messages
-            
-            Config._table.update_item(
-                Key={'id': chat_id_str},
-                UpdateExpression='SET messages = :messages',
-                ExpressionAttributeValues={':messages': messages}
-            )
+        _pending_messages.setdefault(chat_id_str, []).append(message_with_user)
+        _history_cache.pop(chat_id_str, None)
     except Exception as e:
         logger.error(f"Error storing message: {e}")
         raise e
 
+def _write_messages(chat_id_str: str, new_messages: List[Dict[str, Any]]) -> None:
+    """Append messages to a chat's stored history in one atomic update"""
+    # list_append runs server side, so there is no read first and concurrent
+    # writers cannot overwrite each other's messages; the item is created if
+    # missing. _cap_messages then trims the history back to the cap.
+    Config._client.update_item(
+        TableName=Config._table_name,
+        Key=_key(chat_id_str),
+        UpdateExpression=(
+            'SET messages = list_append(if_not_exists(messages, :empty), :new), '
+            'reactions = if_not_exists(reactions, :no_reactions)'
+        ),
+        ExpressionAttributeValues={
+            ':new': to_attribute(new_messages[-MAX_STORED_MESSAGES:]),
+            ':empty': {'L': []},
+            ':no_reactions': {'M': {}}
+        }
+    )
+
+def _cap_messages(chat_id_str: str, appended: int) -> None:
+    """Drop as many of the oldest messages as were just appended if the history is over the cap"""
+    # The stored size is unknown without a read, so DynamoDB checks it; a batch
+    # that crosses the cap leaves the history slightly under it
+    try:
+        Config._client.update_item(
+            TableName=Config._table_name,
+            Key=_key(chat_id_str),
+            UpdateExpression='REMOVE ' + ', '.join(f'messages[{i}]' for i in range(appended)),
+            ConditionExpression='size(messages) > :cap',
+            ExpressionAttributeValues={':cap': {'N': str(MAX_STORED_MESSAGES)}}
+        )
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') != 'ConditionalCheckFailedException':
+            logger.error(f"Error capping chat history for chat {chat_id_str}: {e}")
+
+def _trim_messages(chat_id_str: str, stored_count: int, kept: List[Dict[str, Any]]) -> None:
+    """Drop the oldest messages from a history read with stored_count messages, keeping kept.
+
+    Writes already cap the history; this catches items that grew past the cap
+    some other way, e.g. before writes were capped.
+    """
+    excess = stored_count - len(kept)
+    if excess <= MAX_STORED_MESSAGES:
+        # Let DynamoDB drop the oldest entries itself so only the indexes are sent
+        update = 'REMOVE ' + ', '.join(f'messages[{i}]' for i in range(excess))
+        values = {':count': {'N': str(stored_count)}}
+    else:
+        # Keep the expression well under DynamoDB's size limit for long backlogs
+        update = 'SET messages = :kept'
+        values = {':kept': to_attribute(kept), ':count': {'N': str(stored_count)}}
+    try:
+        # Skip the trim if anything was appended since the read; the next read retries
+        Config._client.update_item(
+            TableName=Config._table_name,
+            Key=_key(chat_id_str),
+            UpdateExpression=update,
+            ConditionExpression='size(messages) = :count',
+            ExpressionAttributeValues=values
+        )
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') != 'ConditionalCheckFailedException':
+            logger.error(f"Error trimming chat history for chat {chat_id_str}: {e}")
+
+def _is_item_too_large(error: ClientError) -> bool:
+    """Whether DynamoDB rejected a write for pushing the item past its 400 KB cap"""
+    details = error.response.get('Error', {})
+    return details.get('Code') == 'ValidationException' and 'size' in details.get('Message', '')
+
+def _reset_messages(chat_id_str: str, new_messages: List[Dict[str, Any]]) -> None:
+    """Replace a chat's full history with its newest messages that still fit in the item"""
+    kept = None
+    while True:
+        if kept is None:
+            response = Config._client.get_item(
+                TableName=Config._table_name,
+                Key=_key(chat_id_str),
+                ProjectionExpression='messages'
+            )
+            stored = response.get('Item', {}).get('messages')
+            stored_messages = from_attribute(stored) if stored is not None else []
+            kept = (stored_messages + new_messages)[-MAX_STORED_MESSAGES:]
+            # Only overwrite the history that was read, so concurrent appends are not lost
+            if stored is None:
+                condition, values = 'attribute_not_exists(messages)', {}
+            else:
+                condition, values = 'size(messages) = :count', {':count': {'N': str(len(stored_messages))}}
+        try:
+            Config._client.update_item(
+                TableName=Config._table_name,
+                Key=_key(chat_id_str),
+                UpdateExpression='SET messages = :kept',
+                ConditionExpression=condition,
+                ExpressionAttributeValues={':kept': to_attribute(kept), **values}
+            )
+            return
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') == 'ConditionalCheckFailedException':
+                # Messages were appended since the read; re-read so they are kept
+                kept = None
+            elif _is_item_too_large(e) and len(kept) > 1:
+                # Halve until the newest messages fit
+                kept = kept[len(kept) // 2:]
+            else:
+                raise
+
+def flush_messages(chat_id: Optional[Union[int, str]] = None) -> None:
+    """Write buffered messages for one chat, or for every chat if none is given"""
+    chat_ids = list(_pending_messages) if chat_id is None else [str(chat_id).strip()]
+    for chat_id_str in chat_ids:
+        new_messages = _pending_messages.pop(chat_id_str, None)
+        if not new_messages:
+            continue
+        try:
+            try:
+                _write_messages(chat_id_str, new_messages)
+                _cap_messages(chat_id_str, min(len(new_messages), MAX_STORED_MESSAGES))
+            except ClientError as e:
+                if not _is_item_too_large(e):
+                    raise
+                # A few very long messages can fill the item before the count cap
+                # is reached, after which every append would fail; keep the newest
+                logger.warning(f"Chat history for chat {chat_id_str} hit the item size limit, dropping its oldest messages")
+                _reset_messages(chat_id_str, new_messages)
+        except Exception as e:
+            logger.error(f"Error storing {len(new_messages)} messages for chat {chat_id_str}: {e}")
+
+def clear_history_cache() -> None:
+    """Forget histories read so far; other instances may write before the next update"""
+    _history_cache.clear()
+
 def add_chat_id_if_reply(message: Dict[str, Any]) -> str:
     """Add reference to replied message in text"""
     text = message["text"]
@@ -110,24 +249,26 @@ def get_from_reaction_to_message(message_reaction: Dict[str, Any]) -> Dict[str,
     """Convert a reaction update to a message format"""
     emoji = message_reaction['new_reaction'][0]['emoji']
     message_id = message_reaction['message_id']
+    user = message_reaction['user']
+    user_get = user.get
+    chat = message_reaction['chat']
     
     # Common message structure for both positive and negative reactions
-    reaction_message = {
+    return {
         'message_id': message_id,
         'from': {
-            'id': message_reaction['user']['id'],
-            'is_bot': message_reaction['user'].get('is_bot', False),
-            'first_name': message_reaction['user'].get('first_name', ''),
-            'username': message_reaction['user'].get('username', '')
+            'id': user['id'],
+            'is_bot': user_get('is_bot', False),
+            'first_name': user_get('first_name', ''),
+            'username': user_get('username', '')
         },
         'chat': {
-            'id': message_reaction['chat']['id'],
-            'type': message_reaction['chat'].get('type', 'unknown')
+            'id': chat['id'],
+            'type': chat.get('type', 'unknown')
         },
         'date': message_reaction['date'],
         'text': f"{emoji} to message_id: {message_id}"
     }
-    return reaction_message
 
 async def clear_chat_history(chat_id: int) -> None:
     """Clear all messages for a specific chat_id from DynamoDB"""
@@ -141,11 +282,17 @@ async def clear_chat_history(chat_id: int) -> None:
         if not chat_id_str:
             raise ValueError("chat_id cannot be empty")
             
+        # Drop buffered messages too, so they are not written back afterwards
+        _pending_messages.pop(chat_id_str, None)
+        _history_cache.pop(chat_id_str, None)
+
         # Update the item to have an empty messages array
-        Config._table.update_item(
-            Key={'id': chat_id_str},
+        await run_blocking(
+            Config._client.update_item,
+            TableName=Config._table_name,
+            Key=_key(chat_id_str),
             UpdateExpression='SET messages = :empty_list',
-            ExpressionAttributeValues={':empty_list': []}
+            ExpressionAttributeValues={':empty_list': {'L': []}}
         )
     except Exception as e:
         logger.error(f"Error clearing chat history: {e}")
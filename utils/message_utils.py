@@ -1,9 +1,10 @@
+import asyncio
 from datetime import datetime
 from typing import List, Dict, Any, Optional
 from loguru import logger
 from services.client import AgentMarketClient
 from services.request_tracker import RequestTracker
-from utils.telegram_utils import send_message
+from services.bot.message_queue import message_queue
 
 async def fetch_new_messages(
     client: AgentMarketClient,
@@ -11,16 +12,24 @@ async def fetch_new_messages(
     provider_id: str,
     last_processed_timestamp: int
 ) -> List[Dict[str, Any]]:
-    """Fetch and filter new messages for a provider."""
+    """Fetch and filter new messages for a provider.
+
+    Each returned message carries its parsed epoch timestamp under '_ts'.
+    """
     try:
         provider_messages = await client.get_conversation_messages(
             instance_id,
             provider_id=provider_id
         )
-        return [
-            msg for msg in provider_messages
-            if int(datetime.fromisoformat(msg.get('timestamp')).timestamp()) > last_processed_timestamp
-        ]
+        new_messages = []
+        append = new_messages.append
+        fromisoformat = datetime.fromisoformat
+        for msg in provider_messages:
+            # Parse once here; callers reuse '_ts' instead of parsing again
+            ts = msg['_ts'] = int(fromisoformat(msg.get('timestamp')).timestamp())
+            if ts > last_processed_timestamp:
+                append(msg)
+        return new_messages
     except Exception as e:
         logger.error(f"Error fetching messages for provider {provider_id}: {e}")
         return []
@@ -44,22 +53,30 @@ async def process_instance_messages(
     client: AgentMarketClient,
     request_tracker: RequestTracker,
     instance_id: str,
-    last_processed_timestamp: int
+    last_processed_timestamp: int,
+    chat_id: Optional[int] = None
 ) -> Optional[int]:
-    """Process all messages for a single instance."""
+    """Process all messages for a single instance.
+
+    chat_id can be passed when the caller already read the tracked request;
+    otherwise it is looked up from the tracker.
+    """
     try:
-        chat_id = request_tracker.get_chat_id_by_instance_id(instance_id)
+        if chat_id is None:
+            chat_id = await request_tracker.get_chat_id_by_instance_id(instance_id)
         if not chat_id:
             return None
 
         winning_providers = await client.get_instance_providers(instance_id)
         latest_timestamp = last_processed_timestamp
 
-        for provider in winning_providers:
-            new_messages = await fetch_new_messages(
-                client, instance_id, provider, last_processed_timestamp
-            )
+        # Fetch every provider's conversation at once; results keep provider order
+        provider_messages = await asyncio.gather(*(
+            fetch_new_messages(client, instance_id, provider, last_processed_timestamp)
+            for provider in winning_providers
+        ))
 
+        for provider, new_messages in zip(winning_providers, provider_messages):
             for message in new_messages:
                 if message.get('sender') == 'provider':
                     formatted_msg = format_provider_message(
@@ -69,12 +86,16 @@ async def process_instance_messages(
                         instance_id=instance_id,
                         timestamp=message.get('timestamp')
                     )
-                    send_message(chat_id=chat_id, text=formatted_msg)
+                    # Replies are routed by the provider and instance in this
+                    # message, so it must not be merged with another one
+                    await message_queue.enqueue(chat_id, formatted_msg, coalesce=False)
 
-                msg_timestamp = int(datetime.fromisoformat(message.get('timestamp')).timestamp())
-                latest_timestamp = max(latest_timestamp, msg_timestamp)
+            if new_messages:
+                latest_timestamp = max(latest_timestamp, max(m['_ts'] for m in new_messages))
 
-        return int(datetime.utcnow().timestamp()) if latest_timestamp > last_processed_timestamp else None
+        # Resume from the newest message seen rather than the wall clock, so
+        # messages posted while this batch was handled are not skipped
+        return latest_timestamp if latest_timestamp > last_processed_timestamp else None
 
     except Exception as e:
         logger.error(f"Error processing instance {instance_id}: {e}")
@@ -1,8 +1,39 @@
-import requests
 import os
 import re
+import orjson
 from typing import Dict, Any, Optional, Tuple
 
+from services.client_session import get_session
+
+# Triple-backtick code blocks, which are left unescaped
+_CODE_BLOCK_RE = re.compile(r'(```[\s\S]*?```)')
+
+# These are all the special characters that need escaping in MarkdownV2
+# Note: We're explicitly including * and _ which are formatting characters
+_MARKDOWN_SPECIAL_RE = re.compile(r'(?<!\\)([\[\]()~`>#+=|{}.!_*-])')
+# Any special character at all, to spot text that needs no escaping
+_MARKDOWN_ANY_SPECIAL_RE = re.compile(r'[\[\]()~`>#+=|{}.!_*-]')
+_MARKDOWN_ESCAPES = str.maketrans({c: '\\' + c for c in '[]()~`>#+=|{}.!_*-'})
+
+# Request bodies are serialized up front, so the content type is set by hand
+_JSON_HEADERS = {'Content-Type': 'application/json'}
+
+# Bot API URLs by method, built on first use from the bot token
+_api_urls: Dict[str, str] = {}
+
+def _api_url(method: str) -> str:
+    """Return the Bot API URL for a method"""
+    url = _api_urls.get(method)
+    if url is None:
+        url = _api_urls[method] = (
+            f"https://api.telegram.org/bot{os.environ['GROUPWRITE_TELEGRAM_BOT_TOKEN']}/{method}"
+        )
+    return url
+
+def _escape_char(match: re.Match) -> str:
+    # A plain function is cheaper per match than expanding a r'\\\1' template
+    return '\\' + match[1]
+
 def escape_markdown(text: str) -> str:
     """
     Escape Telegram MarkdownV2 special characters in text outside of code blocks.
@@ -13,27 +44,38 @@ def escape_markdown(text: str) -> str:
     # Return plain text if input is None or empty
     if not text:
         return ""
+
+    # Plain prose is common; one scan that stops at the first special character
+    # is cheaper than escaping
+    if _MARKDOWN_ANY_SPECIAL_RE.search(text) is None:
+        return text
         
+    if '```' not in text:
+        # Most messages have no code block, so there is nothing to split
+        if text.isascii() and '\\' not in text:
+            return text.translate(_MARKDOWN_ESCAPES)
+        return _MARKDOWN_SPECIAL_RE.sub(_escape_char, text)
+
     # Split by code blocks to preserve them
-    parts = re.split(r'(```[\s\S]*?```)', text)
-    
-    # These are all the special characters that need escaping in MarkdownV2
-    # Note: We're explicitly including * and _ which are formatting characters
-    pattern = r'(?<!\\)([\[\]()~`>#+=|{}.!_*-])'
+    parts = _CODE_BLOCK_RE.split(text)
     
     for i, part in enumerate(parts):
         if part.startswith("```"):
             # Leave code blocks alone
             if len(part) > 3 and part[3] == "\n":
                 parts[i] = "```markdown" + part[3:]
+        elif part.isascii() and '\\' not in part:
+            # Nothing is escaped yet, so one translate pass is enough; it is
+            # only faster than the regex for ASCII text
+            parts[i] = part.translate(_MARKDOWN_ESCAPES)
         else:
-            # Escape special characters
-            parts[i] = re.sub(pattern, r'\\\1', part)
+            # Characters that are already escaped must not be escaped again
+            parts[i] = _MARKDOWN_SPECIAL_RE.sub(_escape_char, part)
     return "".join(parts)
 
-def send_message(chat_id: int, text: str, reply_markup: Optional[Dict] = None, 
+async def send_message(chat_id: int, text: str, reply_markup: Optional[Dict] = None, 
                 reply_to_message_id: Optional[int] = None, parse_mode: Optional[str] = None,
-                disable_notification: bool = False) -> Dict[str, Any]:
+                disable_notification: bool = False, escape: bool = True) -> Dict[str, Any]:
     """
     Send a message to a Telegram chat.
     
@@ -44,18 +86,20 @@ def send_message(chat_id: int, text: str, reply_markup: Optional[Dict] = None,
         reply_to_message_id: Optional message ID to reply to
         parse_mode: The parse mode (None, 'MarkdownV2', 'HTML')
         disable_notification: Whether to send the message silently
+        escape: Whether to escape MarkdownV2 text; pass False for text that
+            is already escaped and carries its own formatting
     
     Returns:
         The response from the Telegram API
     """
-    url = f"https://api.telegram.org/bot{os.environ['GROUPWRITE_TELEGRAM_BOT_TOKEN']}/sendMessage"
+    url = _api_url('sendMessage')
     
     # Handle empty messages
     if not text:
         text = "⚠️ Empty message"
     
     # Escape markdown if needed
-    escaped_text = escape_markdown(text) if parse_mode == 'MarkdownV2' else text
+    escaped_text = escape_markdown(text) if parse_mode == 'MarkdownV2' and escape else text
     
     # Build request data
     data = {
@@ -73,34 +117,34 @@ def send_message(chat_id: int, text: str, reply_markup: Optional[Dict] = None,
     if reply_to_message_id:
         data['reply_to_message_id'] = reply_to_message_id
 
-    try:
-        response = requests.post(url, json=data)
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.HTTPError as e:
+    async with get_session().post(url, data=orjson.dumps(data), headers=_JSON_HEADERS) as response:
+        if response.status < 400:
+            return await response.json(loads=orjson.loads)
+
         # Log error details
-        error_details = f"HTTP Error: {e}\n"
-        if hasattr(e, 'response') and e.response is not None:
-            # Check if response is an object with status_code or a dict with 'status_code' key
-            if hasattr(e.response, 'status_code'):
-                error_details += f"Status Code: {e.response.status_code}\n"
-            elif isinstance(e.response, dict) and 'status_code' in e.response:
-                error_details += f"Status Code: {e.response['status_code']}\n"
-                
-            # Check for text attribute or key
-            if hasattr(e.response, 'text'):
-                error_details += f"Response Content: {e.response.text}\n"
-            elif isinstance(e.response, dict) and 'text' in e.response:
-                error_details += f"Response Content: {e.response['text']}\n"
-                
-            error_details += f"Request Data: {data}\n"
+        response_text = await response.text()
+        error_details = f"HTTP Error: {response.status}, message='{response.reason}'\n"
+        error_details += f"Status Code: {response.status}\n"
+        error_details += f"Response Content: {response_text}\n"
+        error_details += f"Request Data: {data}\n"
         print(f"Telegram API Error: {error_details}")
+
+        # Telegram puts hints such as retry_after for 429s in 'parameters'
+        try:
+            parameters = orjson.loads(response_text).get('parameters', {})
+        except (ValueError, AttributeError):
+            parameters = {}
         
         # Return error info instead of raising exception
         # This allows callers to handle errors gracefully
-        return {'ok': False, 'error': str(e)}
+        return {
+            'ok': False,
+            'error': f"{response.status} {response.reason}",
+            'error_code': response.status,
+            'parameters': parameters
+        }
 
-def edit_message(chat_id: int, message_id: int, text: str, 
+async def edit_message(chat_id: int, message_id: int, text: str, 
                 reply_markup: Optional[Dict] = None, 
                 parse_mode: Optional[str] = 'MarkdownV2') -> Dict[str, Any]:
     """
@@ -116,7 +160,7 @@ def edit_message(chat_id: int, message_id: int, text: str,
     Returns:
         The response from the Telegram API
     """
-    url = f"https://api.telegram.org/bot{os.environ['GROUPWRITE_TELEGRAM_BOT_TOKEN']}/editMessageText"
+    url = _api_url('editMessageText')
     
     # Only escape if a parse mode is specified
     escaped_text = escape_markdown(text) if parse_mode == 'MarkdownV2' else text
@@ -133,29 +177,18 @@ def edit_message(chat_id: int, message_id: int, text: str,
     if reply_markup:
         data['reply_markup'] = reply_markup
 
-    try:
-        response = requests.post(url, json=data)
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.HTTPError as e:
-        # Get the full error details from the response
-        error_details = f"HTTP Error: {e}\n"
-        if hasattr(e, 'response') and e.response is not None:
-            # Check if response is an object with status_code or a dict with 'status_code' key
-            if hasattr(e.response, 'status_code'):
-                error_details += f"Status Code: {e.response.status_code}\n"
-            elif isinstance(e.response, dict) and 'status_code' in e.response:
-                error_details += f"Status Code: {e.response['status_code']}\n"
-                
-            # Check for text attribute or key
-            if hasattr(e.response, 'text'):
-                error_details += f"Response Content: {e.response.text}\n"
-            elif isinstance(e.response, dict) and 'text' in e.response:
-                error_details += f"Response Content: {e.response['text']}\n"
-                
-            error_details += f"Request Data: {data}\n"
+    async with get_session().post(url, data=orjson.dumps(data), headers=_JSON_HEADERS) as response:
+        if response.status < 400:
+            return await response.json(loads=orjson.loads)
+
+        # Log error details
+        response_text = await response.text()
+        error_details = f"HTTP Error: {response.status}, message='{response.reason}'\n"
+        error_details += f"Status Code: {response.status}\n"
+        error_details += f"Response Content: {response_text}\n"
+        error_details += f"Request Data: {data}\n"
         print(f"Telegram API Error: {error_details}")
         
-        # Instead of re-raising the exception, return a dummy response
+        # Instead of raising, return an error response
         # This allows the bot to continue functioning even if a message edit fails
-        return {'ok': False, 'error': str(e)}
+        return {'ok': False, 'error': f"{response.status} {response.reason}"}